@@ -11,16 +11,41 @@ import logging
 from typing import List, Dict, Optional, Tuple, Any
 from dataclasses import dataclass
 from sentence_transformers import SentenceTransformer
+import torch
 from pathlib import Path
 import json
 import hashlib
+from collections import OrderedDict
 from datetime import datetime
 import pickle
 
+# Optional ONNX Runtime for the GPU FP16 inference backend
+try:
+    import onnxruntime
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# HNSW graph parameters for new collections; cosine space makes 1 - distance a similarity.
+# Chroma applies them only when a collection is created: an existing collection keeps
+# its space (L2 by default), so delete chroma_db and re-vectorize to get a cosine index.
+HNSW_CONFIG = {
+    "hnsw:space": "cosine",
+    "hnsw:M": 32,
+    "hnsw:construction_ef": 200,
+    "hnsw:search_ef": 64
+}
+
+# Bulk-load overrides: buffer inserts in brute-force storage and add them to the graph in large batches
+HNSW_BULK_CONFIG = {
+    "hnsw:batch_size": 10000,
+    "hnsw:sync_threshold": 50000
+}
+
 @dataclass
 class SimilarityResult:
     """Result from similarity search"""
@@ -51,6 +76,9 @@ class JapaneseEmbeddingService:
     - Metadata support for enhanced search
     """
     
+    # Sub-batch size for model.encode; larger batches keep a GPU busy
+    ENCODE_BATCH_SIZE = 64
+    
     def __init__(self, 
                  model_name: str = "cl-tohoku/bert-base-japanese-whole-word-masking",
                  db_path: str = "./chroma_db",
@@ -71,7 +99,12 @@ class JapaneseEmbeddingService:
         self.model = None
         self.chroma_client = None
         self.collection = None
+        self.collection_count = 0
+        self.embedding_dimension = None
+        self.distance_space = "cosine"
         self.embedding_cache = {}
+        # LRU of search-query embeddings, kept apart from passage embeddings
+        self.query_embedding_cache: "OrderedDict[str, List[float]]" = OrderedDict()
         
         # Performance tracking
         self.stats = {
@@ -83,30 +116,97 @@ class JapaneseEmbeddingService:
         
         logger.info(f"Initializing Japanese Embedding Service with model: {model_name}")
     
-    async def initialize(self):
-        """Initialize the embedding model and database"""
+    async def initialize(self, bulk_load: bool = False, precision: Optional[str] = None):
+        """
+        Initialize the embedding model and database
+        
+        Args:
+            bulk_load: Create a missing collection with HNSW_BULK_CONFIG for a large initial load
+            precision: "fp32", "fp16" or "int8" to pin the model format (default: fastest available)
+        """
         try:
             # Initialize sentence transformer model
             logger.info("Loading Japanese BERT model...")
-            self.model = SentenceTransformer(self.model_name)
+            self.model = self._load_model(precision)
             logger.info(f"Model loaded successfully. Embedding dimension: {self.model.get_sentence_embedding_dimension()}")
             
             # Initialize Chroma DB
             logger.info("Initializing Chroma DB...")
             self.chroma_client = chromadb.PersistentClient(path=str(self.db_path))
             
-            # Get or create collection for Japanese text
+            # Get or create collection for Japanese text (HNSW settings apply on creation only)
+            hnsw_config = {**HNSW_CONFIG, **HNSW_BULK_CONFIG} if bulk_load else HNSW_CONFIG
             self.collection = self.chroma_client.get_or_create_collection(
                 name="japanese_text_embeddings",
-                metadata={"description": "Japanese text embeddings for semantic analysis"}
+                metadata={"description": "Japanese text embeddings for semantic analysis", **hnsw_config}
             )
-            
-            logger.info(f"Chroma DB initialized. Collection has {self.collection.count()} embeddings")
+            self.distance_space = (self.collection.metadata or {}).get("hnsw:space", "l2")
+            if self.distance_space != "cosine":
+                logger.warning(
+                    f"Collection was created with '{self.distance_space}' distance; similarities are "
+                    f"rescored as cosine, but delete {self.db_path} and re-vectorize for a cosine index"
+                )
+            
+            # Counted here and after bulk writes, so snapshot() never queries Chroma
+            self.refresh_count()
+            self.embedding_dimension = self.model.get_sentence_embedding_dimension()
+            logger.info(f"Chroma DB initialized. Collection has {self.collection_count} embeddings")
             
         except Exception as e:
             logger.error(f"Failed to initialize embedding service: {e}")
             raise
     
+    def _load_model(self, precision: Optional[str] = None) -> SentenceTransformer:
+        """
+        Load the encoder
+        
+        Without a precision, picks the fastest available backend: ONNX Runtime CUDA,
+        FP16 CUDA, then FP32 CPU. "fp32", "fp16" and "int8" pin the numeric format.
+        """
+        if precision not in (None, "fp32", "fp16", "int8"):
+            raise ValueError(f"Unsupported precision: {precision}")
+        
+        if precision is None and ONNXRUNTIME_AVAILABLE and 'CUDAExecutionProvider' in onnxruntime.get_available_providers():
+            try:
+                model = SentenceTransformer(
+                    self.model_name, backend="onnx",
+                    model_kwargs={"provider": "CUDAExecutionProvider"}
+                )
+                logger.info("Using ONNX Runtime CUDA backend")
+                return model
+            except Exception as e:
+                logger.warning(f"ONNX Runtime backend unavailable, falling back to PyTorch: {e}")
+        
+        if precision in (None, "fp16") and torch.cuda.is_available():
+            # Half precision halves memory traffic and uses tensor-core matmuls
+            model = SentenceTransformer(self.model_name, device="cuda")
+            model.half()
+            logger.info("Using PyTorch CUDA backend in FP16")
+            return model
+        
+        if precision == "int8":
+            # Dynamic int8 quantization of the Linear layers (VNNI/AVX2 kernels on CPU)
+            model = SentenceTransformer(self.model_name, device="cpu")
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            logger.info("Using PyTorch CPU backend with dynamic int8 quantization")
+            return model
+        
+        if precision == "fp16":
+            logger.warning("FP16 requested without CUDA, using FP32")
+        return SentenceTransformer(self.model_name)
+    
+    async def warm_up(self):
+        """Run one dummy batch so CUDA context, kernels and tokenizer are ready before real work"""
+        if not self.model:
+            raise RuntimeError("Embedding service not initialized")
+        
+        await asyncio.to_thread(
+            self.model.encode, ["warmup"] * self.ENCODE_BATCH_SIZE,
+            batch_size=self.ENCODE_BATCH_SIZE, convert_to_numpy=True
+        )
+        if torch.cuda.is_available():
+            torch.cuda.synchronize()
+    
     def _generate_text_id(self, text: str) -> str:
         """Generate a unique ID for text"""
         return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
@@ -146,7 +246,41 @@ class JapaneseEmbeddingService:
             logger.error(f"Failed to generate embedding for text: {text[:50]}... Error: {e}")
             raise
     
-    async def embed_batch(self, texts: List[str]) -> List[List[float]]:
+    async def embed_query(self, query: str) -> List[float]:
+        """Embed a search query through the query LRU cache"""
+        query_embedding = self.query_embedding_cache.get(query)
+        if query_embedding is not None:
+            self.query_embedding_cache.move_to_end(query)
+            self.stats['cache_hits'] += 1
+            return query_embedding
+        
+        query_embedding = await self.embed_text(query)
+        self.query_embedding_cache[query] = query_embedding
+        if len(self.query_embedding_cache) > self.cache_size:
+            self.query_embedding_cache.popitem(last=False)
+        return query_embedding
+    
+    async def warm_query_cache(self, queries: List[str]) -> int:
+        """Embed uncached queries in one batched pass and store them in the query LRU cache"""
+        if not self.model:
+            raise RuntimeError("Embedding service not initialized")
+        
+        # Warming past the cache size would only evict the first queries again
+        queries = [query for query in queries if query not in self.query_embedding_cache]
+        queries = queries[:self.cache_size]
+        if not queries:
+            return 0
+        
+        embeddings = await asyncio.to_thread(self.model.encode, queries, batch_size=256, convert_to_numpy=True)
+        for query, embedding in zip(queries, embeddings):
+            self.query_embedding_cache[query] = embedding.tolist()
+        while len(self.query_embedding_cache) > self.cache_size:
+            self.query_embedding_cache.popitem(last=False)
+        
+        self.stats['embeddings_generated'] += len(queries)
+        return len(queries)
+    
+    async def embed_batch(self, texts: List[str]) -> np.ndarray:
         """
         Generate embeddings for multiple texts efficiently
         
@@ -154,7 +288,7 @@ class JapaneseEmbeddingService:
             texts: List of input texts
             
         Returns:
-            List of embeddings
+            float32 array of shape (len(texts), dimension)
         """
         if not self.model:
             raise RuntimeError("Embedding service not initialized")
@@ -174,26 +308,30 @@ class JapaneseEmbeddingService:
                     uncached_texts.append(text)
                     uncached_indices.append(i)
             
+            embeddings = np.empty((len(texts), self.model.get_sentence_embedding_dimension()), dtype=np.float32)
+            for i, embedding in cached_embeddings.items():
+                embeddings[i] = embedding
+            
             # Generate embeddings for uncached texts
             if uncached_texts:
                 logger.info(f"Generating embeddings for {len(uncached_texts)} texts")
-                new_embeddings = self.model.encode(uncached_texts, convert_to_numpy=True)
+                # Encode off the event loop so concurrent batches can overlap; encode()
+                # sorts by length internally, so each sub-batch pads to similar lengths
+                new_embeddings = await asyncio.to_thread(
+                    self.model.encode, uncached_texts,
+                    batch_size=self.ENCODE_BATCH_SIZE, convert_to_numpy=True
+                )
+                embeddings[uncached_indices] = new_embeddings
                 
-                # Cache new embeddings
-                for i, (text_idx, text) in enumerate(zip(uncached_indices, uncached_texts)):
-                    embedding_list = new_embeddings[i].tolist()
-                    cached_embeddings[text_idx] = embedding_list
-                    
-                    # Add to cache if space available
-                    if len(self.embedding_cache) < self.cache_size:
-                        text_hash = self._generate_text_id(text)
-                        self.embedding_cache[text_hash] = embedding_list
+                # Add to cache if space available
+                for text, embedding in zip(uncached_texts, new_embeddings):
+                    if len(self.embedding_cache) >= self.cache_size:
+                        break
+                    self.embedding_cache[self._generate_text_id(text)] = embedding.tolist()
                 
                 self.stats['embeddings_generated'] += len(uncached_texts)
             
-            # Reconstruct results in original order
-            results = [cached_embeddings[i] for i in range(len(texts))]
-            return results
+            return embeddings
             
         except Exception as e:
             logger.error(f"Failed to generate batch embeddings: {e}")
@@ -245,7 +383,8 @@ class JapaneseEmbeddingService:
     async def add_documents_batch(self, 
                                  texts: List[str], 
                                  metadatas: List[Dict[str, Any]], 
-                                 doc_ids: Optional[List[str]] = None) -> List[str]:
+                                 doc_ids: Optional[List[str]] = None,
+                                 embeddings: Optional[np.ndarray] = None) -> List[str]:
         """
         Add multiple documents to the vector database efficiently
         
@@ -253,6 +392,7 @@ class JapaneseEmbeddingService:
             texts: List of document texts
             metadatas: List of document metadata
             doc_ids: Optional list of document IDs
+            embeddings: Precomputed (N, D) embeddings for texts (generated if not provided)
             
         Returns:
             List of document IDs
@@ -270,9 +410,10 @@ class JapaneseEmbeddingService:
             
             # Generate embeddings
             logger.info(f"Processing batch of {len(texts)} documents")
-            embeddings = await self.embed_batch(texts)
+            if embeddings is None:
+                embeddings = await self.embed_batch(texts)
             
-            # Add to collection
+            # Add to collection; Chroma takes the numpy matrix without a list-of-lists copy
             self.collection.add(
                 embeddings=embeddings,
                 documents=texts,
@@ -311,28 +452,59 @@ class JapaneseEmbeddingService:
         
         try:
             # Generate query embedding
-            query_embedding = await self.embed_text(query)
+            query_embedding = await self.embed_query(query)
+        except Exception as e:
+            logger.error(f"Failed to find similar documents: {e}")
+            raise
+        
+        return await self.find_similar_by_vector(query_embedding, top_k, where, threshold)
+    
+    async def find_similar_by_vector(self,
+                                     query_embedding: List[float],
+                                     top_k: int = 10,
+                                     where: Optional[Dict[str, Any]] = None,
+                                     threshold: float = 0.0) -> List[SimilarityResult]:
+        """
+        Find documents similar to an already computed embedding
+        
+        Same as find_similar, without the query forward pass.
+        """
+        if not self.collection:
+            raise RuntimeError("Vector database not initialized")
+        
+        try:
+            # Only cosine distance converts to a similarity as 1 - distance; other spaces
+            # are rescored as cosine from the returned vectors
+            include = ['documents', 'metadatas', 'distances']
+            if self.distance_space != "cosine":
+                include.append('embeddings')
             
             # Search in vector database
             results = self.collection.query(
                 query_embeddings=[query_embedding],
                 n_results=top_k,
                 where=where,
-                include=['documents', 'metadatas', 'distances']
+                include=include
             )
             
             # Process results
             similarity_results = []
             
             if results['ids'] and results['ids'][0]:
+                if self.distance_space == "cosine":
+                    similarities = [1.0 - distance for distance in results['distances'][0]]
+                else:
+                    stored = np.asarray(results['embeddings'][0], dtype=np.float32)
+                    query = np.asarray(query_embedding, dtype=np.float32)
+                    norms = np.maximum(np.linalg.norm(stored, axis=1) * np.linalg.norm(query), 1e-12)
+                    similarities = ((stored @ query) / norms).tolist()
+                
                 for i in range(len(results['ids'][0])):
                     doc_id = results['ids'][0][i]
                     document = results['documents'][0][i]
                     metadata = results['metadatas'][0][i]
                     distance = results['distances'][0][i]
-                    
-                    # Convert distance to similarity score (1 - normalized distance)
-                    similarity = max(0.0, 1.0 - distance)
+                    similarity = max(0.0, similarities[i])
                     
                     # Apply threshold filter
                     if similarity >= threshold:
@@ -343,9 +515,13 @@ class JapaneseEmbeddingService:
                             metadata=metadata,
                             distance=distance
                         ))
+                
+                # L2/IP order can differ from cosine order
+                if self.distance_space != "cosine":
+                    similarity_results.sort(key=lambda result: result.similarity, reverse=True)
             
             self.stats['searches_performed'] += 1
-            logger.debug(f"Found {len(similarity_results)} similar documents for query: {query[:50]}...")
+            logger.debug(f"Found {len(similarity_results)} similar documents")
             
             return similarity_results
             
@@ -377,6 +553,34 @@ class JapaneseEmbeddingService:
             logger.error(f"Failed to get collection stats: {e}")
             raise
     
+    def suggest_batch_size(self) -> int:
+        """Largest ingest batch size that is safe for the loaded model and device"""
+        if not self.model:
+            raise RuntimeError("Embedding service not initialized")
+        
+        limit = 2048 if torch.cuda.is_available() else 128
+        # Activation memory grows with sequence length; the limit assumes 128-token inputs
+        max_seq_length = self.model.max_seq_length or 512
+        return max(16, min(limit, limit * 128 // max_seq_length))
+    
+    def refresh_count(self) -> int:
+        """Re-count the collection; snapshot() reports the last counted value"""
+        self.collection_count = self.collection.count()
+        return self.collection_count
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Collection and cache counters from in-process state, without querying Chroma"""
+        lookups = self.stats['embeddings_generated'] + self.stats['cache_hits']
+        total_vectors = self.collection_count
+        return {
+            'processed': self.stats['documents_added'],
+            'total_vectors': total_vectors,
+            'db_size_mb': (total_vectors * (self.embedding_dimension or 768) * 4) / (1024 * 1024),
+            'cache_hit_rate': self.stats['cache_hits'] / lookups if lookups else 0.0,
+            'embedding_dimension': self.embedding_dimension,
+            'model_name': self.model_name
+        }
+    
     def get_performance_stats(self) -> Dict[str, Any]:
         """Get performance statistics"""
         cache_hit_rate = 0.0
@@ -397,14 +601,16 @@ class JapaneseEmbeddingService:
             # Chroma DB automatically persists data
             pass
         self.embedding_cache.clear()
+        self.query_embedding_cache.clear()
 
 # Global embedding service instance
 embedding_service = JapaneseEmbeddingService()
 
 # Initialization function for use in FastAPI startup
-async def initialize_embedding_service():
+async def initialize_embedding_service(bulk_load: bool = False, precision: Optional[str] = None):
     """Initialize the global embedding service"""
-    await embedding_service.initialize()
+    await embedding_service.initialize(bulk_load=bulk_load, precision=precision)
+    await embedding_service.warm_up()
     logger.info("Embedding service initialization complete")
 
 # Shutdown function for use in FastAPI shutdown
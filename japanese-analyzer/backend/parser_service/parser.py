@@ -154,6 +154,14 @@ except Exception as e:
     dependency_validator = None
 
 # --- LIFESPAN CONTEXT MANAGER ---
+async def _warm_query_cache():
+    """Pre-embed common headwords once the service is accepting requests"""
+    try:
+        warmed = await vector_db_manager.warm_query_cache()
+        print(f"SUCCESS: Warmed query cache with {warmed} embeddings.")
+    except Exception as e:
+        print(f"WARNING: Could not warm the query cache: {e}")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan context manager for startup and shutdown events"""
@@ -162,6 +170,7 @@ async def lifespan(app: FastAPI):
     
     # Startup
     print("SUCCESS: Advanced Japanese Parser service starting up...")
+    warm_task = None
     
     try:
         # Core NLP model should already be loaded at module level
@@ -249,6 +258,9 @@ async def lifespan(app: FastAPI):
         if VECTOR_DB_AVAILABLE:
             try:
                 await initialize_embedding_service()
+                vector_db_manager.warm_up()
+                # Embedding thousands of headwords takes tens of seconds on CPU; do it after startup
+                warm_task = asyncio.create_task(_warm_query_cache())
                 print("SUCCESS: Vector database and embedding service initialized.")
             except Exception as e:
                 print(f"WARNING: Could not initialize vector database: {e}")
@@ -264,9 +276,12 @@ async def lifespan(app: FastAPI):
     yield
     
     # Shutdown
+    if warm_task is not None:
+        warm_task.cancel()
     if VECTOR_DB_AVAILABLE:
         try:
             await shutdown_embedding_service()
+            vector_db_manager.close()
             print("SUCCESS: Vector database service shut down cleanly.")
         except Exception as e:
             print(f"WARNING: Error shutting down vector database: {e}")
@@ -395,6 +410,11 @@ class AnalysisResponse(BaseModel):
     parsing_insights: Optional[Dict] = None
     semantic_suggestions: List[SemanticSuggestion] = []
 
+def _construct_model(model_cls, **fields):
+    """Build a pydantic model from trusted internal data without validation"""
+    construct = getattr(model_cls, "model_construct", None) or model_cls.construct
+    return construct(**fields)
+
 # --- ENHANCED SEGMENTATION RULES ---
 
 # Expressions that should ALWAYS be kept together
@@ -1066,9 +1086,10 @@ async def _analyze_basic(request: AnalyzeRequest):
                 dependency=dependency_info
             ))
     
-    # Prepare syntactic patterns for response
+    # Prepare syntactic patterns for response (internal data, skip re-validation)
     pattern_infos = [
-        SyntacticPatternInfo(
+        _construct_model(
+            SyntacticPatternInfo,
             pattern_type=pattern.pattern_type,
             description=pattern.description,
             confidence=pattern.confidence,
@@ -1,17 +1,53 @@
 # stacked_consensus.py - Advanced Stacked Generalization for Japanese NLP Consensus
 import numpy as np
-import pandas as pd
-from typing import List, Dict, Optional, Tuple, Any
-from dataclasses import dataclass
+from typing import List, Dict, Optional, Tuple, Any, FrozenSet
+from dataclasses import dataclass, field
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
 from sklearn.linear_model import ElasticNet
 from sklearn.metrics import mean_squared_error, mean_absolute_error
 from sklearn.model_selection import cross_val_score
-import pickle
+import joblib
 import json
+import math
+import pickle
+import hashlib
 from pathlib import Path
+from collections import Counter
+from itertools import combinations
+from concurrent.futures import ThreadPoolExecutor
 
-@dataclass
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Numba is optional: without it the JIT-decorated helpers run as plain NumPy
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    def njit(*args, **kwargs):
+        def decorator(func):
+            return func
+        return decorator
+
+def _mean(xs) -> float:
+    """Mean of a short sequence without NumPy dispatch overhead"""
+    n = len(xs)
+    return math.fsum(xs) / n if n else 0.0
+
+def _std(xs, m: Optional[float] = None) -> float:
+    """Population standard deviation of a short sequence (matches np.std)"""
+    n = len(xs)
+    if not n:
+        return 0.0
+    if m is None:
+        m = _mean(xs)
+    return math.sqrt(math.fsum((x - m) ** 2 for x in xs) / n)
+
+@dataclass(frozen=True)
 class TokenizerResult:
     """Result from a single tokenizer"""
     tokenizer_name: str
@@ -21,6 +57,22 @@ class TokenizerResult:
     pos_tags: List[str]
     features: Dict[str, Any]
     processing_time: float
+    
+    # Derived statistics, computed once since results are never mutated
+    confidence_mean: float = field(init=False, repr=False, compare=False)
+    boundary_set: FrozenSet[int] = field(init=False, repr=False, compare=False)
+    token_lengths: np.ndarray = field(init=False, repr=False, compare=False)
+    num_tokens: int = field(init=False, repr=False, compare=False)
+    text_cache: str = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        object.__setattr__(self, 'confidence_mean',
+                           _mean(self.confidence_scores) if self.confidence_scores else 0.5)
+        object.__setattr__(self, 'boundary_set', frozenset(self.boundaries))
+        object.__setattr__(self, 'token_lengths',
+                           np.fromiter((len(t) for t in self.tokens), dtype=np.int64, count=len(self.tokens)))
+        object.__setattr__(self, 'num_tokens', len(self.tokens))
+        object.__setattr__(self, 'text_cache', "".join(self.tokens))
 
 @dataclass
 class ConsensusResult:
@@ -43,6 +95,49 @@ class TrainingExample:
     ground_truth_boundaries: List[int]
     text_features: Dict[str, float]
 
+@njit(cache=True)
+def _threshold_votes(all_boundaries: np.ndarray, threshold: int) -> np.ndarray:
+    """Sorted boundary positions whose vote count exceeds the threshold"""
+    votes = np.bincount(all_boundaries)
+    return np.flatnonzero(votes > threshold)
+
+def _concat_boundaries(predictions: Dict[str, TokenizerResult]) -> np.ndarray:
+    """All tokenizers' boundaries as one int64 array"""
+    
+    if not predictions:
+        return np.zeros(0, dtype=np.int64)
+    
+    return np.concatenate([
+        np.asarray(result.boundaries, dtype=np.int64) for result in predictions.values()
+    ])
+
+def _tally_boundaries(predictions: Dict[str, TokenizerResult],
+                      weighted: bool = False) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Count boundary votes per position, optionally weighted by model confidence"""
+    
+    if not predictions:
+        return np.zeros(0, dtype=np.int64), (np.zeros(0) if weighted else None)
+    
+    votes = np.bincount(_concat_boundaries(predictions))
+    
+    weights = None
+    if weighted:
+        weights = np.zeros(votes.size, dtype=np.float64)
+        for result in predictions.values():
+            np.add.at(weights, np.asarray(result.boundaries, dtype=np.int64), result.confidence_mean)
+    
+    return votes, weights
+
+def _segmentation_hashes(predictions: Dict[str, TokenizerResult]) -> np.ndarray:
+    """One 64-bit signature per tokenizer segmentation, in prediction order"""
+    
+    # Hash the token tuple: joining on a separator would equate ["a|b"] with ["a", "b"]
+    return np.fromiter(
+        (hash(tuple(result.tokens)) & 0xFFFFFFFFFFFFFFFF for result in predictions.values()),
+        dtype=np.uint64,
+        count=len(predictions)
+    )
+
 class MetaFeatureExtractor:
     """Extract meta-features for stacked generalization"""
     
@@ -80,63 +175,79 @@ class MetaFeatureExtractor:
         
         features = {}
         
-        # Pairwise agreement calculation
-        agreements = []
-        tokenizer_names = list(predictions.keys())
-        
-        for i in range(len(tokenizer_names)):
-            for j in range(i + 1, len(tokenizer_names)):
-                name1, name2 = tokenizer_names[i], tokenizer_names[j]
-                agreement = self._calculate_pairwise_agreement(
-                    predictions[name1], predictions[name2]
-                )
-                agreements.append(agreement)
+        # Pairwise agreement calculation (matrix setup only pays off for wider ensembles)
+        if len(predictions) < 4:
+            agreements = np.array([
+                self._calculate_pairwise_agreement(a, b)
+                for a, b in combinations(predictions.values(), 2)
+            ])
+        else:
+            agreements = self._calculate_pairwise_agreements(predictions)
         
-        features['pairwise_agreement'] = np.mean(agreements) if agreements else 0.0
-        features['agreement_std'] = np.std(agreements) if agreements else 0.0
+        features['pairwise_agreement'] = np.mean(agreements) if agreements.size else 0.0
+        features['agreement_std'] = np.std(agreements) if agreements.size else 0.0
         
         # Boundary consensus
-        all_boundaries = set()
-        boundary_votes = {}
+        boundary_votes, _ = _tally_boundaries(predictions)
+        unique_boundaries = np.count_nonzero(boundary_votes)
         
-        for result in predictions.values():
-            all_boundaries.update(result.boundaries)
-            for boundary in result.boundaries:
-                boundary_votes[boundary] = boundary_votes.get(boundary, 0) + 1
-        
-        if all_boundaries:
-            consensus_boundaries = [b for b, votes in boundary_votes.items() 
-                                  if votes > len(predictions) // 2]
-            features['boundary_consensus'] = len(consensus_boundaries) / len(all_boundaries)
+        if unique_boundaries:
+            consensus_count = np.count_nonzero(boundary_votes > len(predictions) // 2)
+            features['boundary_consensus'] = consensus_count / unique_boundaries
         else:
             features['boundary_consensus'] = 0.0
         
-        # Token-level agreement
+        # Token-level agreement over a padded (tokenizer x position) grid
         token_agreements = []
         max_tokens = max(len(result.tokens) for result in predictions.values())
         
-        for i in range(max_tokens):
-            tokens_at_position = []
-            for result in predictions.values():
-                if i < len(result.tokens):
-                    tokens_at_position.append(result.tokens[i])
+        if max_tokens:
+            # Intern tokens to integer ids; -1 marks padding past a tokenizer's last token
+            vocab = {}
+            grid = np.full((len(predictions), max_tokens), -1, dtype=np.int64)
+            for i, result in enumerate(predictions.values()):
+                grid[i, :len(result.tokens)] = [vocab.setdefault(t, len(vocab)) for t in result.tokens]
+            
+            # Count only the (position, token id) keys that occur, then keep each position's best count
+            positions = np.broadcast_to(np.arange(max_tokens), grid.shape)
+            present = grid >= 0
+            keys = positions[present] * len(vocab) + grid[present]
+            unique_keys, counts = np.unique(keys, return_counts=True)
+            best_counts = np.zeros(max_tokens, dtype=np.int64)
+            np.maximum.at(best_counts, unique_keys // len(vocab), counts)
             
-            if tokens_at_position:
-                most_common = max(set(tokens_at_position), key=tokens_at_position.count)
-                agreement = tokens_at_position.count(most_common) / len(tokens_at_position)
-                token_agreements.append(agreement)
+            token_agreements = best_counts / present.sum(axis=0)
         
-        features['token_agreement_mean'] = np.mean(token_agreements) if token_agreements else 0.0
-        features['token_agreement_std'] = np.std(token_agreements) if token_agreements else 0.0
+        features['token_agreement_mean'] = np.mean(token_agreements) if len(token_agreements) else 0.0
+        features['token_agreement_std'] = np.std(token_agreements) if len(token_agreements) else 0.0
         
         return features
     
+    def _calculate_pairwise_agreements(self, predictions: Dict[str, TokenizerResult]) -> np.ndarray:
+        """Calculate boundary Jaccard agreement for every tokenizer pair at once"""
+        
+        results = list(predictions.values())
+        max_b = max((max(r.boundaries, default=0) for r in results), default=0) + 1
+        
+        # Boundary incidence matrix: one row per tokenizer, one column per position
+        A = np.zeros((len(results), max_b), dtype=np.float32)
+        for i, result in enumerate(results):
+            A[i, result.boundaries] = 1.0
+        
+        inter = A @ A.T
+        row_sums = A.sum(axis=1)
+        union = row_sums[:, None] + row_sums[None, :] - inter
+        
+        iu = np.triu_indices(len(results), k=1)
+        inter, union = inter[iu], union[iu]
+        return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+    
     def _calculate_pairwise_agreement(self, result1: TokenizerResult, result2: TokenizerResult) -> float:
-        """Calculate agreement between two tokenizer results"""
+        """Calculate agreement between two tokenizer results (scalar fallback)"""
         
         # Boundary-based agreement
-        boundaries1 = set(result1.boundaries)
-        boundaries2 = set(result2.boundaries)
+        boundaries1 = result1.boundary_set
+        boundaries2 = result2.boundary_set
         
         intersection = len(boundaries1 & boundaries2)
         union = len(boundaries1 | boundaries2)
@@ -149,18 +260,19 @@ class MetaFeatureExtractor:
         features = {}
         
         # Individual model confidences
-        all_confidences = []
-        for name, result in predictions.items():
-            if result.confidence_scores:
-                model_confidence = np.mean(result.confidence_scores)
-                all_confidences.append(model_confidence)
-                features[f'{name}_confidence'] = model_confidence
-        
-        if all_confidences:
-            features['confidence_mean'] = np.mean(all_confidences)
-            features['confidence_std'] = np.std(all_confidences)
-            features['confidence_min'] = np.min(all_confidences)
-            features['confidence_max'] = np.max(all_confidences)
+        scored = [(name, result) for name, result in predictions.items() if result.confidence_scores]
+        for name, result in scored:
+            features[f'{name}_confidence'] = result.confidence_mean
+        
+        if scored:
+            all_confidences = np.fromiter((result.confidence_mean for _, result in scored),
+                                          dtype=np.float64, count=len(scored))
+            features.update({
+                'confidence_mean': all_confidences.mean(),
+                'confidence_std': all_confidences.std(),
+                'confidence_min': all_confidences.min(),
+                'confidence_max': all_confidences.max()
+            })
         else:
             features.update({
                 'confidence_mean': 0.5,
@@ -176,16 +288,21 @@ class MetaFeatureExtractor:
         
         features = {}
         
+        # Decode once into a codepoint array for vectorized range checks
+        codepoints = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+        char_variety = np.unique(codepoints).size
+        
         # Basic text statistics
         features['text_length'] = len(text)
-        features['char_variety'] = len(set(text))
-        features['avg_char_frequency'] = len(text) / max(len(set(text)), 1)
+        features['char_variety'] = char_variety
+        features['avg_char_frequency'] = len(text) / max(char_variety, 1)
         
         # Japanese script analysis
-        hiragana_count = sum(1 for c in text if '\u3040' <= c <= '\u309F')
-        katakana_count = sum(1 for c in text if '\u30A0' <= c <= '\u30FF')
-        kanji_count = sum(1 for c in text if '\u4E00' <= c <= '\u9FAF')
-        latin_count = sum(1 for c in text if c.isalpha() and ord(c) < 128)
+        hiragana_count = int(((codepoints >= 0x3040) & (codepoints <= 0x309F)).sum())
+        katakana_count = int(((codepoints >= 0x30A0) & (codepoints <= 0x30FF)).sum())
+        kanji_count = int(((codepoints >= 0x4E00) & (codepoints <= 0x9FAF)).sum())
+        latin_count = int((((codepoints >= 65) & (codepoints <= 90)) |
+                           ((codepoints >= 97) & (codepoints <= 122))).sum())
         
         total_chars = len(text)
         if total_chars > 0:
@@ -217,18 +334,15 @@ class MetaFeatureExtractor:
         
         features = {}
         
-        # Average token lengths across models
-        token_lengths = []
-        for result in predictions.values():
-            if result.tokens:
-                lengths = [len(token) for token in result.tokens]
-                token_lengths.extend(lengths)
-        
-        if token_lengths:
-            features['avg_token_length'] = np.mean(token_lengths)
-            features['token_length_std'] = np.std(token_lengths)
-            features['max_token_length'] = np.max(token_lengths)
-            features['min_token_length'] = np.min(token_lengths)
+        # Average token lengths across models, reduced over one contiguous buffer
+        length_arrays = [result.token_lengths for result in predictions.values() if result.tokens]
+        
+        if length_arrays:
+            token_lengths = np.concatenate(length_arrays)
+            features['avg_token_length'] = token_lengths.mean()
+            features['token_length_std'] = token_lengths.std()
+            features['max_token_length'] = token_lengths.max()
+            features['min_token_length'] = token_lengths.min()
         else:
             features.update({
                 'avg_token_length': 1.0,
@@ -238,10 +352,11 @@ class MetaFeatureExtractor:
             })
         
         # Token count statistics
-        token_counts = [len(result.tokens) for result in predictions.values()]
-        if token_counts:
-            features['avg_token_count'] = np.mean(token_counts)
-            features['token_count_std'] = np.std(token_counts)
+        token_counts = np.fromiter((result.num_tokens for result in predictions.values()),
+                                   dtype=np.int32, count=len(predictions))
+        if token_counts.size:
+            features['avg_token_count'] = token_counts.mean()
+            features['token_count_std'] = token_counts.std()
         else:
             features['avg_token_count'] = 1.0
             features['token_count_std'] = 0.0
@@ -262,12 +377,8 @@ class MetaFeatureExtractor:
         features = {}
         
         # Segmentation diversity
-        unique_segmentations = set()
-        for result in predictions.values():
-            segmentation_tuple = tuple(result.tokens)
-            unique_segmentations.add(segmentation_tuple)
-        
-        features['segmentation_diversity'] = len(unique_segmentations) / max(len(predictions), 1)
+        hashes = _segmentation_hashes(predictions)
+        features['segmentation_diversity'] = np.unique(hashes).size / max(len(predictions), 1)
         
         # Boundary position variance
         all_boundary_positions = []
@@ -282,8 +393,8 @@ class MetaFeatureExtractor:
         # Processing time features
         processing_times = [result.processing_time for result in predictions.values()]
         if processing_times:
-            features['avg_processing_time'] = np.mean(processing_times)
-            features['processing_time_std'] = np.std(processing_times)
+            features['avg_processing_time'] = _mean(processing_times)
+            features['processing_time_std'] = _std(processing_times)
         else:
             features['avg_processing_time'] = 0.0
             features['processing_time_std'] = 0.0
@@ -295,7 +406,7 @@ class StackedGeneralizationConsensus:
     
     def __init__(self, model_config: Optional[Dict] = None):
         self.model_config = model_config or {
-            'primary': RandomForestRegressor(n_estimators=100, random_state=42),
+            'primary': RandomForestRegressor(n_estimators=100, oob_score=True, n_jobs=-1, random_state=42),
             'secondary': GradientBoostingRegressor(n_estimators=100, random_state=42),
             'tertiary': ElasticNet(alpha=0.1, random_state=42)
         }
@@ -305,6 +416,8 @@ class StackedGeneralizationConsensus:
         self.is_trained = False
         self.feature_names = []
         self.model_weights = {}
+        self._ordered_learners = []
+        self._weight_vector = np.zeros(0)
         
     def train_meta_learners(self, training_examples: List[TrainingExample]) -> Dict[str, float]:
         """Train meta-learners on training data"""
@@ -327,13 +440,18 @@ class StackedGeneralizationConsensus:
             print(f"Training {name} meta-learner...")
             
             try:
-                # Cross-validation for model evaluation
-                cv_scores = cross_val_score(model, X, y, cv=min(5, len(X)), 
-                                          scoring='neg_mean_squared_error')
-                training_scores[name] = -np.mean(cv_scores)
-                
-                # Train on full dataset
-                model.fit(X, y)
+                if getattr(model, 'oob_score', False):
+                    # Bagged learners: the out-of-bag estimate comes free with a single fit
+                    model.fit(X, y)
+                    training_scores[name] = mean_squared_error(y, model.oob_prediction_)
+                else:
+                    # Cross-validation for model evaluation
+                    cv_scores = cross_val_score(model, X, y, cv=min(5, len(X)), 
+                                              scoring='neg_mean_squared_error')
+                    training_scores[name] = -np.mean(cv_scores)
+                    
+                    # Train on full dataset
+                    model.fit(X, y)
                 self.meta_learners[name] = model
                 
                 print(f"{name} CV RMSE: {training_scores[name]:.4f}")
@@ -353,38 +471,61 @@ class StackedGeneralizationConsensus:
     def _prepare_training_data(self, training_examples: List[TrainingExample]) -> Tuple[np.ndarray, np.ndarray]:
         """Prepare training data for meta-learners"""
         
-        X_list = []
-        y_list = []
+        # Serial on purpose: extraction is pure Python and holds the GIL, so threads only add
+        # overhead, and process workers would pickle self and the predictions for every batch
+        processed = [self._process_training_example(example) for example in training_examples]
         
-        for example in training_examples:
-            try:
-                # Extract meta-features
-                meta_features = self.feature_extractor.extract_meta_features(
-                    example.base_predictions, example.text
-                )
-                
-                # Calculate target (quality score)
-                target_score = self._calculate_quality_score(
-                    example.base_predictions,
-                    example.ground_truth_tokens,
-                    example.ground_truth_boundaries
-                )
-                
-                if meta_features and not np.isnan(target_score):
-                    # Store feature names on first iteration
-                    if not self.feature_names:
-                        self.feature_names = sorted(meta_features.keys())
-                    
-                    # Create feature vector
-                    feature_vector = [meta_features.get(name, 0.0) for name in self.feature_names]
-                    X_list.append(feature_vector)
-                    y_list.append(target_score)
-                    
-            except Exception as e:
-                print(f"Error processing training example: {e}")
+        feature_dicts = []
+        names = set()
+        y = np.empty(len(training_examples), dtype=np.float64)
+        
+        for item in processed:
+            if item is None:
                 continue
+            meta_features, target_score = item
+            y[len(feature_dicts)] = target_score
+            feature_dicts.append(meta_features)
+            names.update(meta_features.keys())
+        
+        if not feature_dicts:
+            return np.empty((0, len(self.feature_names))), np.empty(0)
+        
+        # Store feature names once the full feature set is known
+        if not self.feature_names:
+            self.feature_names = sorted(names)
+        
+        # Vectorize the dict -> matrix step into a single pre-sized contiguous allocation
+        X = np.fromiter(
+            (d.get(name, 0.0) for d in feature_dicts for name in self.feature_names),
+            dtype=np.float64,
+            count=len(feature_dicts) * len(self.feature_names)
+        ).reshape(len(feature_dicts), len(self.feature_names))
+        
+        return X, y[:len(feature_dicts)]
+    
+    def _process_training_example(self, example: TrainingExample) -> Optional[Tuple[Dict[str, float], float]]:
+        """Extract meta-features and quality target for one training example"""
         
-        return np.array(X_list), np.array(y_list)
+        try:
+            # Extract meta-features
+            meta_features = self.feature_extractor.extract_meta_features(
+                example.base_predictions, example.text
+            )
+            
+            # Calculate target (quality score)
+            target_score = self._calculate_quality_score(
+                example.base_predictions,
+                example.ground_truth_tokens,
+                example.ground_truth_boundaries
+            )
+            
+            if meta_features and not np.isnan(target_score):
+                return meta_features, target_score
+                
+        except Exception as e:
+            print(f"Error processing training example: {e}")
+        
+        return None
     
     def _calculate_quality_score(self, predictions: Dict[str, TokenizerResult], 
                                ground_truth_tokens: List[str],
@@ -413,14 +554,12 @@ class StackedGeneralizationConsensus:
             return []
         
         # Find most common segmentation
-        segmentation_votes = {}
-        for result in predictions.values():
-            segmentation_key = tuple(result.tokens)
-            segmentation_votes[segmentation_key] = segmentation_votes.get(segmentation_key, 0) + 1
+        results = list(predictions.values())
+        hashes = _segmentation_hashes(predictions).tolist()
         
-        if segmentation_votes:
-            most_common = max(segmentation_votes.keys(), key=lambda x: segmentation_votes[x])
-            return list(most_common)
+        if hashes:
+            most_common, _ = Counter(hashes).most_common(1)[0]
+            return list(results[hashes.index(most_common)].tokens)
         
         # Fallback to first result
         return list(predictions.values())[0].tokens
@@ -428,16 +567,9 @@ class StackedGeneralizationConsensus:
     def _extract_consensus_boundaries(self, predictions: Dict[str, TokenizerResult]) -> List[int]:
         """Extract consensus boundaries from predictions"""
         
-        boundary_votes = {}
-        for result in predictions.values():
-            for boundary in result.boundaries:
-                boundary_votes[boundary] = boundary_votes.get(boundary, 0) + 1
-        
         # Majority vote threshold
         threshold = len(predictions) // 2
-        consensus_boundaries = [b for b, votes in boundary_votes.items() if votes > threshold]
-        
-        return sorted(consensus_boundaries)
+        return _threshold_votes(_concat_boundaries(predictions), threshold).tolist()
     
     def _calculate_token_f1(self, predicted: List[str], ground_truth: List[str]) -> float:
         """Calculate F1 score for token sequences"""
@@ -485,6 +617,7 @@ class StackedGeneralizationConsensus:
         
         if not training_scores:
             self.model_weights = {}
+            self._refresh_weight_vector()
             return
         
         # Convert RMSE to weights (lower RMSE = higher weight)
@@ -502,66 +635,129 @@ class StackedGeneralizationConsensus:
         else:
             # Equal weights fallback
             self.model_weights = {name: 1.0 / len(weights) for name in weights.keys()}
+        
+        self._refresh_weight_vector()
+    
+    def _refresh_weight_vector(self):
+        """Align model weights with meta-learner order for the batched dot product"""
+        
+        default_weight = 1.0 / len(self.meta_learners) if self.meta_learners else 0.0
+        self._ordered_learners = [
+            (name, model, self.model_weights.get(name, default_weight))
+            for name, model in self.meta_learners.items()
+        ]
+        self._weight_vector = np.array(
+            [weight for _, _, weight in self._ordered_learners], dtype=np.float64
+        )
     
     def generate_consensus(self, base_predictions: Dict[str, TokenizerResult], text: str) -> ConsensusResult:
         """Generate consensus using trained meta-learners"""
         
+        return self.generate_consensus_batch([(base_predictions, text)])[0]
+    
+    def generate_consensus_batch(self, inputs: List[Tuple[Dict[str, TokenizerResult], str]]) -> List[ConsensusResult]:
+        """Generate consensus for many texts with one predict call per meta-learner"""
+        
+        # Unanimous segmentations need no meta-learning
+        results: List[Optional[ConsensusResult]] = [
+            self._unanimous_consensus(preds) for preds, _ in inputs
+        ]
+        
         if not self.is_trained:
             print("Warning: Meta-learners not trained, using simple voting consensus")
-            return self._fallback_consensus(base_predictions, text)
+            return [result if result is not None else self._fallback_consensus(preds, text)
+                    for result, (preds, text) in zip(results, inputs)]
         
         try:
-            # Extract meta-features
-            meta_features = self.feature_extractor.extract_meta_features(base_predictions, text)
-            
-            if not meta_features:
-                return self._fallback_consensus(base_predictions, text)
-            
-            # Prepare feature vector
-            feature_vector = np.array([[meta_features.get(name, 0.0) for name in self.feature_names]])
-            
-            # Get predictions from meta-learners
-            meta_predictions = {}
-            for name, model in self.meta_learners.items():
-                try:
-                    prediction = model.predict(feature_vector)[0]
-                    meta_predictions[name] = prediction
-                except Exception as e:
-                    print(f"Error with meta-learner {name}: {e}")
+            # Extract meta-features, falling back for inputs that yield none
+            batch_indices = []
+            batch_features = []
+            for i, (base_predictions, text) in enumerate(inputs):
+                if results[i] is not None:
                     continue
+                meta_features = self.feature_extractor.extract_meta_features(base_predictions, text)
+                if meta_features:
+                    batch_indices.append(i)
+                    batch_features.append(meta_features)
+                else:
+                    results[i] = self._fallback_consensus(base_predictions, text)
             
-            if not meta_predictions:
-                return self._fallback_consensus(base_predictions, text)
-            
-            # Weighted ensemble of meta-learner predictions
-            weighted_prediction = sum(
-                pred * self.model_weights.get(name, 1.0 / len(meta_predictions))
-                for name, pred in meta_predictions.items()
-            )
-            
-            # Use weighted prediction to guide consensus generation
-            consensus_tokens, consensus_boundaries = self._generate_weighted_consensus(
-                base_predictions, weighted_prediction
-            )
-            
-            # Calculate final confidence and uncertainty
-            confidence = max(0.0, min(1.0, weighted_prediction))
-            uncertainty = 1.0 - confidence
+            if batch_indices:
+                # Stack feature vectors into an (N x F) matrix
+                X = np.array([[mf.get(name, 0.0) for name in self.feature_names] for mf in batch_features])
+                
+                # Get predictions from meta-learners, one row per learner
+                rows = []
+                weights = []
+                for name, model, weight in self._ordered_learners:
+                    try:
+                        rows.append(model.predict(X))
+                        weights.append(weight)
+                    except Exception as e:
+                        print(f"Error with meta-learner {name}: {e}")
+                        continue
+                
+                if not rows:
+                    for i in batch_indices:
+                        results[i] = self._fallback_consensus(*inputs[i])
+                    return results
+                
+                # Weighted ensemble of meta-learner predictions
+                weighted_predictions = np.vstack(rows).T @ np.asarray(weights)
+                
+                for i, meta_features, weighted_prediction in zip(batch_indices, batch_features,
+                                                                 weighted_predictions.tolist()):
+                    base_predictions = inputs[i][0]
+                    
+                    # Use weighted prediction to guide consensus generation
+                    consensus_tokens, consensus_boundaries = self._generate_weighted_consensus(
+                        base_predictions, weighted_prediction
+                    )
+                    
+                    # Calculate final confidence and uncertainty
+                    confidence = max(0.0, min(1.0, weighted_prediction))
+                    uncertainty = 1.0 - confidence
+                    
+                    results[i] = ConsensusResult(
+                        tokens=consensus_tokens,
+                        boundaries=consensus_boundaries,
+                        confidence=confidence,
+                        uncertainty=uncertainty,
+                        contributing_models=self.model_weights.copy(),
+                        meta_features=meta_features,
+                        individual_predictions=base_predictions,
+                        consensus_method="stacked_generalization"
+                    )
             
-            return ConsensusResult(
-                tokens=consensus_tokens,
-                boundaries=consensus_boundaries,
-                confidence=confidence,
-                uncertainty=uncertainty,
-                contributing_models=self.model_weights.copy(),
-                meta_features=meta_features,
-                individual_predictions=base_predictions,
-                consensus_method="stacked_generalization"
-            )
+            return results
             
         except Exception as e:
             print(f"Error in consensus generation: {e}")
-            return self._fallback_consensus(base_predictions, text)
+            return [result if result is not None else self._fallback_consensus(preds, text)
+                    for result, (preds, text) in zip(results, inputs)]
+    
+    def _unanimous_consensus(self, predictions: Dict[str, TokenizerResult]) -> Optional[ConsensusResult]:
+        """Return the shared segmentation if every tokenizer produced identical boundaries"""
+        
+        if not predictions:
+            return None
+        
+        # Joined text is the same for every tokenizer, so compare boundaries instead
+        signatures = {tuple(result.boundaries) for result in predictions.values()}
+        if len(signatures) != 1:
+            return None
+        
+        result = next(iter(predictions.values()))
+        return ConsensusResult(
+            tokens=list(result.tokens),
+            boundaries=list(result.boundaries),
+            confidence=1.0,
+            uncertainty=0.0,
+            contributing_models={name: 1.0/len(predictions) for name in predictions.keys()},
+            meta_features={},
+            individual_predictions=predictions,
+            consensus_method="unanimous_fast_path"
+        )
     
     def _generate_weighted_consensus(self, predictions: Dict[str, TokenizerResult], 
                                    meta_prediction: float) -> Tuple[List[str], List[int]]:
@@ -571,7 +767,7 @@ class StackedGeneralizationConsensus:
         if meta_prediction > 0.8:
             # High confidence: prefer most confident individual model
             best_model = max(predictions.items(), 
-                           key=lambda x: np.mean(x[1].confidence_scores) if x[1].confidence_scores else 0.5)
+                           key=lambda x: x[1].confidence_mean)
             return best_model[1].tokens, best_model[1].boundaries
         
         elif meta_prediction < 0.3:
@@ -586,72 +782,53 @@ class StackedGeneralizationConsensus:
         """Conservative consensus that prefers agreement"""
         
         # Find boundaries agreed upon by majority
-        boundary_votes = {}
-        for result in predictions.values():
-            for boundary in result.boundaries:
-                boundary_votes[boundary] = boundary_votes.get(boundary, 0) + 1
+        boundary_votes, _ = _tally_boundaries(predictions)
         
         # Require super-majority for boundary inclusion
         threshold = len(predictions) * 0.6  # 60% agreement
-        consensus_boundaries = sorted([b for b, votes in boundary_votes.items() if votes >= threshold])
+        consensus_boundaries = np.flatnonzero(
+            (boundary_votes >= threshold) & (boundary_votes > 0)
+        ).tolist()
         
         # Generate tokens from consensus boundaries
         if len(consensus_boundaries) < 2:
             # Fallback to single token
-            return [predictions[list(predictions.keys())[0]].tokens[0] if predictions else ""], [0, 1]
+            return [next(iter(predictions.values())).tokens[0] if predictions else ""], [0, 1]
         
         # Extract text and generate tokens
-        full_text = "".join(list(predictions.values())[0].tokens)
-        consensus_tokens = []
-        
-        for i in range(len(consensus_boundaries) - 1):
-            start = consensus_boundaries[i]
-            end = consensus_boundaries[i + 1]
-            if start < len(full_text) and end <= len(full_text):
-                token = full_text[start:end]
-                if token:
-                    consensus_tokens.append(token)
-        
-        return consensus_tokens, consensus_boundaries
+        full_text = next(iter(predictions.values())).text_cache
+        return self._slice_tokens(full_text, consensus_boundaries), consensus_boundaries
     
     def _confidence_weighted_consensus(self, predictions: Dict[str, TokenizerResult]) -> Tuple[List[str], List[int]]:
         """Confidence-weighted consensus generation"""
         
         # Weight each model's contribution by its confidence
-        weighted_boundaries = {}
-        
-        for name, result in predictions.items():
-            model_confidence = np.mean(result.confidence_scores) if result.confidence_scores else 0.5
-            
-            for boundary in result.boundaries:
-                if boundary not in weighted_boundaries:
-                    weighted_boundaries[boundary] = 0.0
-                weighted_boundaries[boundary] += model_confidence
+        boundary_votes, weighted_boundaries = _tally_boundaries(predictions, weighted=True)
         
         # Select boundaries with highest weighted votes
-        total_confidence = sum(np.mean(r.confidence_scores) if r.confidence_scores else 0.5 
-                             for r in predictions.values())
+        total_confidence = sum(r.confidence_mean for r in predictions.values())
         threshold = total_confidence * 0.5  # 50% of total confidence
         
-        consensus_boundaries = sorted([b for b, weight in weighted_boundaries.items() 
-                                     if weight >= threshold])
+        consensus_boundaries = np.flatnonzero(
+            (weighted_boundaries >= threshold) & (boundary_votes > 0)
+        ).tolist()
         
         # Generate tokens
         if not consensus_boundaries:
             return self._fallback_consensus(predictions, "")[0:2]
         
-        full_text = "".join(list(predictions.values())[0].tokens)
-        consensus_tokens = []
-        
-        for i in range(len(consensus_boundaries) - 1):
-            start = consensus_boundaries[i]
-            end = consensus_boundaries[i + 1]
-            if start < len(full_text) and end <= len(full_text):
-                token = full_text[start:end]
-                if token:
-                    consensus_tokens.append(token)
-        
-        return consensus_tokens, consensus_boundaries
+        full_text = next(iter(predictions.values())).text_cache
+        return self._slice_tokens(full_text, consensus_boundaries), consensus_boundaries
+    
+    def _slice_tokens(self, full_text: str, boundaries: List[int]) -> List[str]:
+        """Cut the text into tokens between consecutive consensus boundaries"""
+        
+        text_length = len(full_text)
+        return [
+            full_text[start:end]
+            for start, end in zip(boundaries, boundaries[1:])
+            if start < text_length and end <= text_length and start < end
+        ]
     
     def _fallback_consensus(self, predictions: Dict[str, TokenizerResult], text: str) -> ConsensusResult:
         """Fallback consensus using simple voting"""
@@ -683,33 +860,57 @@ class StackedGeneralizationConsensus:
             consensus_method="fallback_voting"
         )
     
+    def _feature_names_hash(self) -> str:
+        """Fingerprint of the feature order the meta-learners were trained on"""
+        return hashlib.sha256("\n".join(self.feature_names).encode('utf-8')).hexdigest()
+    
     def save_models(self, save_path: str):
         """Save trained meta-learners to disk"""
         
         save_dir = Path(save_path)
         save_dir.mkdir(exist_ok=True)
         
-        # Save meta-learners
-        for name, model in self.meta_learners.items():
-            model_path = save_dir / f"{name}_meta_learner.pkl"
-            with open(model_path, 'wb') as f:
-                pickle.dump(model, f)
+        features_hash = self._feature_names_hash()
+        
+        # Save meta-learners uncompressed so their arrays can be memory-mapped on load;
+        # dumps are I/O bound, so write them concurrently
+        with ThreadPoolExecutor(max_workers=max(len(self.meta_learners), 1)) as executor:
+            futures = [
+                executor.submit(
+                    joblib.dump,
+                    {'model': model, 'feature_names_hash': features_hash},
+                    save_dir / f"{name}_meta_learner.joblib"
+                )
+                for name, model in self.meta_learners.items()
+            ]
+            for future in futures:
+                future.result()
         
         # Save metadata
         metadata = {
             'feature_names': self.feature_names,
-            'model_weights': self.model_weights,
+            'feature_names_hash': features_hash,
+            # Weights come out of NumPy reductions; orjson rejects numpy scalars
+            'model_weights': {name: float(weight) for name, weight in self.model_weights.items()},
             'is_trained': self.is_trained
         }
         
         metadata_path = save_dir / "metadata.json"
-        with open(metadata_path, 'w', encoding='utf-8') as f:
-            json.dump(metadata, f, ensure_ascii=False, indent=2)
+        if ORJSON_AVAILABLE:
+            with open(metadata_path, 'wb') as f:
+                f.write(orjson.dumps(metadata, option=orjson.OPT_INDENT_2))
+        else:
+            with open(metadata_path, 'w', encoding='utf-8') as f:
+                json.dump(metadata, f, ensure_ascii=False, indent=2)
         
         print(f"Models saved to {save_path}")
     
     def load_models(self, load_path: str):
-        """Load trained meta-learners from disk"""
+        """Load trained meta-learners from disk
+        
+        Forest/boosting arrays (tree_.value, tree_.threshold, ...) are memory-mapped
+        read-only, so worker processes loading the same models share resident pages.
+        """
         
         load_dir = Path(load_path)
         if not load_dir.exists():
@@ -725,15 +926,29 @@ class StackedGeneralizationConsensus:
             self.model_weights = metadata['model_weights']
             self.is_trained = metadata['is_trained']
         
+        features_hash = self._feature_names_hash()
+        
         # Load meta-learners
         self.meta_learners = {}
         for name in self.model_config.keys():
-            model_path = load_dir / f"{name}_meta_learner.pkl"
+            model_path = load_dir / f"{name}_meta_learner.joblib"
             if model_path.exists():
-                with open(model_path, 'rb') as f:
+                payload = joblib.load(model_path, mmap_mode='r')
+                if payload['feature_names_hash'] != features_hash:
+                    raise ValueError(
+                        f"Meta-learner {name} was trained on a different feature set than "
+                        f"{metadata_path.name}; retrain or re-save the models"
+                    )
+                self.meta_learners[name] = payload['model']
+            elif (load_dir / f"{name}_meta_learner.pkl").exists():
+                # Models saved before the joblib format: a bare pickled model with no feature hash,
+                # matched to metadata.json by position as before; save_models rewrites them
+                with open(load_dir / f"{name}_meta_learner.pkl", 'rb') as f:
                     self.meta_learners[name] = pickle.load(f)
         
+        self._refresh_weight_vector()
+        
         if self.meta_learners:
             print(f"Loaded {len(self.meta_learners)} meta-learners from {load_path}")
         else:
-            raise RuntimeError("No meta-learners found to load")
\ No newline at end of file
+            raise RuntimeError("No meta-learners found to load")
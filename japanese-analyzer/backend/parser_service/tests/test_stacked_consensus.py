@@ -0,0 +1,105 @@
+# backend/parser_service/tests/test_stacked_consensus.py
+import pickle
+import sys
+from pathlib import Path
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import ElasticNet
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from stacked_consensus import StackedGeneralizationConsensus, TokenizerResult, TrainingExample, _segmentation_hashes
+
+
+def _result(name, tokens, confidence):
+    boundaries = np.cumsum([len(token) for token in tokens])[:-1].tolist()
+    return TokenizerResult(
+        tokenizer_name=name,
+        tokens=tokens,
+        boundaries=boundaries,
+        confidence_scores=[confidence] * len(tokens),
+        pos_tags=['NOUN'] * len(tokens),
+        features={},
+        processing_time=0.01
+    )
+
+
+def _examples():
+    segmentations = [
+        (["私", "は", "学生", "です"], ["私は", "学生", "です"]),
+        (["今日", "は", "晴れ", "です"], ["今日", "は", "晴れです"]),
+        (["本", "を", "読む"], ["本を", "読む"]),
+        (["猫", "が", "好き"], ["猫", "が好き"]),
+        (["東京", "に", "行く"], ["東京に", "行く"]),
+        (["水", "を", "飲む"], ["水", "を", "飲む"]),
+    ]
+    examples = []
+    for i, (gold, other) in enumerate(segmentations):
+        predictions = {
+            'spacy': _result('spacy', gold, 0.9),
+            'janome': _result('janome', other, 0.5 + 0.05 * i)
+        }
+        examples.append(TrainingExample(
+            text="".join(gold),
+            base_predictions=predictions,
+            ground_truth_tokens=gold,
+            ground_truth_boundaries=predictions['spacy'].boundaries,
+            text_features={}
+        ))
+    return examples
+
+
+def _consensus():
+    return StackedGeneralizationConsensus(model_config={
+        'primary': RandomForestRegressor(n_estimators=10, oob_score=True, random_state=0),
+        'tertiary': ElasticNet(alpha=0.1, random_state=0)
+    })
+
+
+def test_save_and_load_models_round_trip(tmp_path):
+    examples = _examples()
+    trained = _consensus()
+    trained.train_meta_learners(examples)
+    trained.save_models(str(tmp_path))
+    
+    loaded = _consensus()
+    loaded.load_models(str(tmp_path))
+    
+    assert loaded.is_trained
+    assert loaded.feature_names == trained.feature_names
+    assert loaded.model_weights == {name: float(weight) for name, weight in trained.model_weights.items()}
+    assert set(loaded.meta_learners) == set(trained.meta_learners)
+    
+    example = examples[0]
+    expected = trained.generate_consensus(example.base_predictions, example.text)
+    actual = loaded.generate_consensus(example.base_predictions, example.text)
+    assert actual.tokens == expected.tokens
+    assert actual.confidence == expected.confidence
+
+
+def test_load_models_reads_legacy_pickles(tmp_path):
+    examples = _examples()
+    trained = _consensus()
+    trained.train_meta_learners(examples)
+    trained.save_models(str(tmp_path))
+    for name, model in trained.meta_learners.items():
+        (tmp_path / f"{name}_meta_learner.joblib").unlink()
+        with open(tmp_path / f"{name}_meta_learner.pkl", 'wb') as f:
+            pickle.dump(model, f)
+    
+    loaded = _consensus()
+    loaded.load_models(str(tmp_path))
+    
+    assert set(loaded.meta_learners) == set(trained.meta_learners)
+    example = examples[0]
+    expected = trained.generate_consensus(example.base_predictions, example.text)
+    assert loaded.generate_consensus(example.base_predictions, example.text).tokens == expected.tokens
+
+
+def test_segmentation_hashes_keep_separator_tokens_apart():
+    predictions = {'spacy': _result('spacy', ["a|b"], 0.9), 'janome': _result('janome', ["a", "b"], 0.9)}
+    
+    hashes = _segmentation_hashes(predictions)
+    
+    assert hashes[0] != hashes[1]
@@ -0,0 +1,69 @@
+# backend/parser_service/tests/test_uncertainty_quantifier.py
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("spacy")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from uncertainty_quantifier import MonteCarloDropoutUncertainty
+
+
+class _FakeDoc:
+    """Doc-like sequence of one-character tokens"""
+
+    def __init__(self, text):
+        self.text = text
+        self._tokens = [SimpleNamespace(text=char, idx=i, pos_='NOUN') for i, char in enumerate(text)]
+
+    def __iter__(self):
+        return iter(self._tokens)
+
+    def __len__(self):
+        return len(self._tokens)
+
+
+class _FakeNLP:
+    """Character tokenizer standing in for a spaCy pipeline with no torch components"""
+
+    pipe_names = []
+
+    def __init__(self):
+        self.docs_made = 0
+
+    def pipe(self, texts, batch_size=None):
+        for text in texts:
+            self.docs_made += 1
+            yield _FakeDoc(text)
+
+
+def test_defaults_draw_every_sample_and_memoize():
+    nlp = _FakeNLP()
+    quantifier = MonteCarloDropoutUncertainty(nlp, n_samples=20)
+
+    result = quantifier.estimate_uncertainty("猫が好き")
+
+    assert result.method == "monte_carlo_dropout"
+    assert result.segmentation == ("猫", "が", "好", "き")
+    assert nlp.docs_made == 20
+
+    assert quantifier.estimate_uncertainty("猫が好き") is result
+    assert nlp.docs_made == 20
+
+    quantifier.n_samples = 10
+    quantifier.estimate_uncertainty("猫が好き")
+    assert nlp.docs_made == 30
+
+
+def test_early_stop_is_opt_in_and_named_in_method():
+    nlp = _FakeNLP()
+    quantifier = MonteCarloDropoutUncertainty(nlp, n_samples=50, early_stop=True)
+
+    result = quantifier.estimate_uncertainty("猫が好き")
+
+    assert nlp.docs_made == MonteCarloDropoutUncertainty.EARLY_STOP_MIN
+    assert result.method == f"mc_dropout_adaptive_n={MonteCarloDropoutUncertainty.EARLY_STOP_MIN}"
@@ -0,0 +1,240 @@
+# backend/parser_service/tests/test_vector_database.py
+import asyncio
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+pytest.importorskip("chromadb")
+pytest.importorskip("sentence_transformers")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import vector_database
+from vector_database import VectorDatabaseManager
+
+N_ENTRIES = 120
+DIM = 16
+
+
+class _FakeCollection:
+    """In-memory stand-in for the Chroma collection (first add of an id wins)"""
+
+    def __init__(self):
+        self.store = {}
+
+    def add(self, embeddings, documents, metadatas, ids):
+        if len(set(ids)) != len(ids):
+            raise ValueError("duplicate ids in one add() call")
+        for embedding, document, metadata, doc_id in zip(embeddings, documents, metadatas, ids):
+            self.store.setdefault(doc_id, (np.asarray(embedding), document, metadata))
+
+    def get(self, ids=None, where=None, include=None, limit=None):
+        if where is not None:
+            conditions = where.get('$or', [where])
+            ids = [doc_id for doc_id, (_, _, metadata) in self.store.items()
+                   if any(all(metadata.get(k) == v for k, v in c.items()) for c in conditions)]
+        ids = [doc_id for doc_id in ids if doc_id in self.store]
+        return {
+            'ids': ids,
+            'embeddings': [self.store[doc_id][0] for doc_id in ids],
+            'metadatas': [self.store[doc_id][2] for doc_id in ids],
+        }
+
+    def count(self):
+        return len(self.store)
+
+
+class _FakeEmbeddingService:
+    """Deterministic text -> vector service writing into a _FakeCollection"""
+
+    model_name = "fake-model"
+    chroma_client = None
+
+    def __init__(self, db_path):
+        self.model = object()
+        self.collection = _FakeCollection()
+        self.db_path = db_path
+        self.collection_count = 0
+        self.embedded = 0
+
+    def _embed(self, text):
+        rng = np.random.default_rng(int.from_bytes(text.encode('utf-8')[-8:].ljust(8, b'\0'), 'little'))
+        return rng.standard_normal(DIM).astype(np.float32)
+
+    async def embed_batch(self, texts):
+        self.embedded += len(texts)
+        return np.stack([self._embed(text) for text in texts])
+
+    async def embed_query(self, text):
+        return self._embed(text).tolist()
+
+    async def add_documents_batch(self, texts, metadatas, doc_ids=None, embeddings=None):
+        self.collection.add(embeddings, texts, metadatas, doc_ids)
+        return doc_ids
+
+    def refresh_count(self):
+        self.collection_count = self.collection.count()
+        return self.collection_count
+
+    def snapshot(self):
+        return {'total_vectors': self.collection_count, 'db_size_mb': 0.0,
+                'embedding_dimension': DIM, 'model_name': self.model_name}
+
+
+def _write_dictionary(path, n_entries=N_ENTRIES, senses_per_entry=1):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE entries (ent_seq INTEGER, kanji_elements TEXT, reading_elements TEXT)")
+    conn.execute("CREATE TABLE senses (ent_seq INTEGER, glosses TEXT, parts_of_speech TEXT)")
+    for i in range(n_entries):
+        ent_seq = 1000 + i
+        conn.execute("INSERT INTO entries VALUES (?, ?, ?)",
+                     (ent_seq, json.dumps([f"語{i}"]), json.dumps([f"ご{i}"])))
+        for sense in range(senses_per_entry):
+            conn.execute("INSERT INTO senses VALUES (?, ?, ?)",
+                         (ent_seq, json.dumps([f"word number {i} sense {sense}"]), json.dumps(["noun"])))
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    dictionary_path = tmp_path / "dictionary.sqlite"
+    _write_dictionary(dictionary_path)
+    service = _FakeEmbeddingService(tmp_path / "chroma_db")
+    monkeypatch.setattr(vector_database, "embedding_service", service)
+    manager = VectorDatabaseManager(str(dictionary_path))
+    yield manager
+    manager.close()
+
+
+def test_full_run_publishes_only_when_complete(manager):
+    asyncio.run(manager.vectorize_dictionary(batch_size=20))
+    first_matrix = manager._matrix
+    assert manager.generation == 1
+    assert manager._matrix_size == N_ENTRIES
+
+    async def interrupt_second_run():
+        stream = manager.vectorize_dictionary_stream(batch_size=20)
+        async for processed, total in stream:
+            if processed:
+                # Mid-run, searches still see the previous complete matrix
+                assert manager._matrix is first_matrix
+                assert len(manager._live_matrix()[1]) == N_ENTRIES
+                assert manager.generation == 1
+                await stream.aclose()
+                break
+
+    asyncio.run(interrupt_second_run())
+    assert manager._matrix is first_matrix
+    assert manager.generation == 1
+    assert manager._staged_size == 0
+
+    asyncio.run(manager.vectorize_dictionary(batch_size=20))
+    assert manager.generation == 2
+    reloaded = VectorDatabaseManager(manager.dictionary_db_path)
+    try:
+        assert reloaded._matrix_ids == manager._matrix_ids
+        np.testing.assert_array_equal(reloaded._matrix[:reloaded._matrix_size],
+                                      manager._matrix[:manager._matrix_size])
+    finally:
+        reloaded.close()
+
+
+def test_limited_run_leaves_live_matrix_alone(manager):
+    asyncio.run(manager.vectorize_dictionary(batch_size=20))
+    live_ids = list(manager._matrix_ids)
+    generation = manager.generation
+
+    asyncio.run(manager.vectorize_dictionary(batch_size=20, max_entries=30))
+
+    assert manager._matrix_size == N_ENTRIES
+    assert manager._matrix_ids == live_ids
+    assert manager.generation == generation
+    assert VectorDatabaseManager(manager.dictionary_db_path)._matrix_size == N_ENTRIES
+
+
+
+def test_one_row_per_sense_inserts_each_entry_once(tmp_path, monkeypatch):
+    dictionary_path = tmp_path / "dictionary.sqlite"
+    _write_dictionary(dictionary_path, senses_per_entry=3)
+    service = _FakeEmbeddingService(tmp_path / "chroma_db")
+    monkeypatch.setattr(vector_database, "embedding_service", service)
+    manager = VectorDatabaseManager(str(dictionary_path))
+    try:
+        asyncio.run(manager.vectorize_dictionary(batch_size=20))
+
+        assert service.collection.count() == N_ENTRIES
+        assert manager._matrix_size == N_ENTRIES
+        for doc_id in ("dict_1000", "dict_1119"):
+            stored = service.collection.store[doc_id][0]
+            np.testing.assert_allclose(manager._matrix[manager._matrix_rows[doc_id]],
+                                       stored / np.linalg.norm(stored), rtol=1e-5)
+    finally:
+        manager.close()
+
+
+
+def test_flat_table_lives_in_sidecar_and_follows_dictionary(manager):
+    dictionary_path = manager.dictionary_db_path
+    before = Path(dictionary_path).read_bytes()
+    assert manager._count_dictionary_entries() == N_ENTRIES
+
+    assert Path(dictionary_path).read_bytes() == before
+    with sqlite3.connect(manager.embedding_cache_path) as sidecar:
+        assert sidecar.execute("SELECT COUNT(*) FROM entries_flat").fetchone()[0] == N_ENTRIES
+
+    manager.close()
+    Path(dictionary_path).unlink()
+    _write_dictionary(dictionary_path, n_entries=N_ENTRIES + 5)
+    rebuilt = VectorDatabaseManager(dictionary_path)
+    try:
+        assert rebuilt._count_dictionary_entries() == N_ENTRIES + 5
+    finally:
+        rebuilt.close()
+
+
+
+def test_resumed_run_reuses_exact_cached_vectors(manager, monkeypatch):
+    asyncio.run(manager.vectorize_dictionary(batch_size=20))
+    fresh = manager._matrix[:manager._matrix_size].copy()
+
+    # Resume from a checkpoint against an emptied collection, as after a crash mid-run
+    service = _FakeEmbeddingService(manager.dictionary_db_path)
+    monkeypatch.setattr(vector_database, "embedding_service", service)
+    report = asyncio.run(manager.vectorize_dictionary(batch_size=20, start_id=1059))
+
+    assert service.embedded == 0
+    assert report.cache_hit_rate == 1.0
+    assert sorted(service.collection.store) == [f"dict_{1060 + i}" for i in range(60)]
+    assert manager._matrix_size == N_ENTRIES
+    np.testing.assert_array_equal(manager._matrix[:manager._matrix_size], fresh)
+    for embedding, document, _ in service.collection.store.values():
+        np.testing.assert_array_equal(embedding, service._embed(document))
+
+
+@pytest.mark.parametrize("pq_min_rows, ivf_built, pq_built", [(300, True, False), (100, False, True)])
+def test_large_run_builds_only_its_tier_index(tmp_path, monkeypatch, pq_min_rows, ivf_built, pq_built):
+    pytest.importorskip("faiss")
+    dictionary_path = tmp_path / "dictionary.sqlite"
+    _write_dictionary(dictionary_path, n_entries=300)  # PQ codebooks need 256 training rows
+    monkeypatch.setattr(vector_database, "embedding_service", _FakeEmbeddingService(tmp_path / "chroma_db"))
+    monkeypatch.setattr(VectorDatabaseManager, "EXACT_SEARCH_MAX_ROWS", 40)
+    monkeypatch.setattr(VectorDatabaseManager, "PQ_MIN_ROWS", pq_min_rows)
+    monkeypatch.setattr(VectorDatabaseManager, "PQ_SUBQUANTIZERS", 4)
+    manager = VectorDatabaseManager(str(dictionary_path))
+    manager.warm_up()  # compile the rerank kernel on the main thread, as parser.py does
+    try:
+        asyncio.run(manager.vectorize_dictionary(batch_size=50))
+
+        assert (manager.ivf_index is not None) == ivf_built
+        assert (manager.pq_index is not None) == pq_built
+        assert Path(manager.ivf_index_path).exists() == ivf_built
+        assert Path(manager.pq_index_path).exists() == pq_built
+        hits = asyncio.run(manager.semantic_word_search("word number 7 sense 0", top_k=3, similarity_threshold=-1.0))
+        assert hits
+    finally:
+        manager.close()
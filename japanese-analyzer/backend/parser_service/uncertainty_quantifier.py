@@ -2,23 +2,40 @@
 import torch
 import numpy as np
 import math
-from typing import List, Tuple, Dict, Optional
-from collections import defaultdict
+from typing import Any, Iterator, List, Tuple, Dict, Optional
+from collections import Counter
+from functools import lru_cache
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+# Numba is optional: without it the JIT-decorated kernels run as plain Python/NumPy
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+    def njit(*args, **kwargs):
+        def decorator(func):
+            return func
+        return decorator
 from dataclasses import dataclass
+from scipy.special import xlogy
 import spacy
 from spacy.tokens import Doc
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class UncertaintyResult:
-    """Result of uncertainty quantification"""
-    segmentation: List[str]
+    """Result of uncertainty quantification (immutable, safe to share from the cache)"""
+    segmentation: Tuple[str, ...]
     uncertainty_score: float
     confidence: float
-    token_uncertainties: List[float]
-    boundary_confidence: List[float]
+    token_uncertainties: Tuple[float, ...]
+    boundary_confidence: Tuple[float, ...]
     method: str
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class TokenUncertainty:
     """Uncertainty information for individual tokens"""
     token: str
@@ -27,106 +44,379 @@ class TokenUncertainty:
     reading_uncertainty: float
     overall_uncertainty: float
 
+@njit(parallel=True, fastmath=True, cache=True)
+def _pos_entropy(surface_ids: np.ndarray, pos_ids: np.ndarray, n_surfaces: int, n_tags: int) -> np.ndarray:
+    """Entropy (bits) of the POS distribution observed for each unique surface"""
+    counts = np.zeros((n_surfaces, n_tags), dtype=np.float64)
+    for k in range(surface_ids.shape[0]):
+        counts[surface_ids[k], pos_ids[k]] += 1.0
+    
+    entropy = np.zeros(n_surfaces, dtype=np.float64)
+    for i in prange(n_surfaces):
+        total = counts[i].sum()
+        h = 0.0
+        for j in range(n_tags):
+            if counts[i, j] > 0:
+                p = counts[i, j] / total
+                h -= p * np.log2(p)
+        entropy[i] = h
+    return entropy
+
+# Shared POS tag -> integer id vocabulary for struct-of-arrays predictions; new tags
+# are added under the lock so concurrent model threads never hand out the same id
+_POS_IDS: Dict[str, int] = {}
+_POS_IDS_LOCK = threading.Lock()
+
+def _pos_id(tag: str) -> int:
+    """Intern a POS tag into the shared vocabulary"""
+    pos_id = _POS_IDS.get(tag)
+    if pos_id is None:
+        with _POS_IDS_LOCK:
+            pos_id = _POS_IDS.setdefault(tag, len(_POS_IDS))
+    return pos_id
+
+def _make_prediction(text: str, surfaces: List[str], starts: List[int], ends: List[int],
+                     pos_tags: List[str], boundaries: List[int]) -> Dict:
+    """Pack one segmentation as parallel arrays instead of a list of token dicts"""
+    return {
+        'text': text,
+        'surfaces': surfaces,
+        'starts': np.asarray(starts, dtype=np.int32),
+        'ends': np.asarray(ends, dtype=np.int32),
+        'pos_ids': np.fromiter((_pos_id(tag) for tag in pos_tags), dtype=np.int16, count=len(pos_tags)),
+        'boundaries': np.asarray(boundaries, dtype=np.int32)
+    }
+
 class MonteCarloDropoutUncertainty:
-    """Monte Carlo Dropout for uncertainty estimation in Japanese NLP"""
+    """Monte Carlo Dropout for uncertainty estimation in Japanese NLP
+    
+    By default every estimate draws all n_samples dropout passes. The cheaper
+    approximations are opt-in: fast_dropout (single-pass Gaussian, or concrete
+    masks on the head with concrete) and early_stop (stop sampling once boundary
+    votes settle). UncertaintyResult.method names the one that produced a result.
+    """
+    
+    # Pipes whose model is chain(tok2vec, softmax) and exposes both refs
+    FAST_DROPOUT_PIPES = ('morphologizer', 'tagger')
     
-    def __init__(self, nlp_model, n_samples: int = 50):
+    # Sequential stopping: check every EARLY_STOP_CHECK samples once EARLY_STOP_MIN are drawn
+    EARLY_STOP_CHECK = 5
+    EARLY_STOP_MIN = 10
+    EARLY_STOP_VARIANCE = 0.01
+    
+    def __init__(self, nlp_model, n_samples: int = 50, fast_dropout: bool = False,
+                 quantize: bool = False, concrete: bool = False,
+                 amp_dtype: Optional[torch.dtype] = None, early_stop: bool = False):
         self.nlp_model = nlp_model
         self.n_samples = n_samples
+        self.early_stop = early_stop
         self.dropout_rate = 0.1
+        self.fast_dropout = fast_dropout
+        self.concrete = concrete
+        self.concrete_temperature = 0.1
+        self._rng = np.random.default_rng()
+        # Mixed precision for GPU sampling; BF16 keeps FP32's exponent range for softmax
+        self.amp_dtype = amp_dtype if amp_dtype is not None else torch.bfloat16
+        self.quantized = quantize and self._quantize_transformer()
+        
+        # Dropout is forced through hooks only while sampling, so the model stays in eval mode
+        self._dropout_active = False
+        self._dropout_hooks = self._install_dropout_hooks()
+        
+        # Per-instance memo of full estimates; sampling settings are part of the key
+        self._estimate_cached = lru_cache(maxsize=4096)(self._estimate_uncached)
+    
+    def cache_clear(self) -> None:
+        """Drop all memoized uncertainty estimates"""
+        self._estimate_cached.cache_clear()
+    
+    def cache_info(self):
+        """Hit/miss statistics for memoized uncertainty estimates"""
+        return self._estimate_cached.cache_info()
+    
+    def _quantize_transformer(self) -> bool:
+        """Dynamically quantize the transformer's Linear layers to INT8 (CPU only)
+        
+        Only nn.Linear is swapped, so dropout modules keep working for MC sampling.
+        """
+        
+        if 'transformer' not in getattr(self.nlp_model, 'pipe_names', []):
+            return False
+        
+        try:
+            shim = self.nlp_model.get_pipe('transformer').model.shims[0]
+            if 'fbgemm' in torch.backends.quantized.supported_engines:
+                torch.backends.quantized.engine = 'fbgemm'
+            shim._model = torch.ao.quantization.quantize_dynamic(
+                shim._model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+            print(f"Transformer quantized to INT8 ({torch.backends.quantized.engine})")
+            return True
+        except Exception as e:
+            print(f"INT8 quantization unavailable: {e}")
+            return False
         
     def estimate_uncertainty(self, text: str) -> UncertaintyResult:
         """Estimate segmentation uncertainty using Monte Carlo Dropout"""
         
-        # Generate multiple predictions with dropout
-        predictions = []
-        
-        for _ in range(self.n_samples):
-            # Process text with stochastic forward pass
-            doc = self._process_with_dropout(text)
-            
-            # Extract segmentation and features
-            segmentation = self._extract_segmentation(doc)
-            predictions.append(segmentation)
+        return self._estimate_cached(text, self.n_samples, self.dropout_rate,
+                                     self.fast_dropout, self.concrete, self.early_stop)
+    
+    def _estimate_uncached(self, text: str, n_samples: int, dropout_rate: float,
+                           fast_dropout: bool, concrete: bool, early_stop: bool) -> UncertaintyResult:
+        """Run the estimate; settings arguments only key the cache and mirror self"""
+        
+        # Single pipeline pass when the pipeline exposes a softmax head: either
+        # concrete-relaxed masks sampled on the head, or the Gaussian approximation
+        if self.fast_dropout:
+            if self.concrete:
+                fast_result, method = self._concrete_dropout_forward(text), "concrete_dropout"
+            else:
+                fast_result, method = self._fast_dropout_forward(text), "fast_dropout"
+            if fast_result is not None:
+                doc, token_entropies, n_classes = fast_result
+                uncertainty_scores = self._calculate_fast_dropout_scores(doc, token_entropies, n_classes)
+                return UncertaintyResult(
+                    segmentation=tuple(token.text for token in doc),
+                    uncertainty_score=uncertainty_scores['overall'],
+                    confidence=1.0 - uncertainty_scores['overall'],
+                    token_uncertainties=tuple(uncertainty_scores['tokens']),
+                    boundary_confidence=tuple(uncertainty_scores['boundaries']),
+                    method=method
+                )
+        
+        # Generate predictions with dropout; n_samples stays the worst-case bound
+        predictions = self._sample_predictions(text)
+        n_drawn = len(predictions)
         
         # Calculate consensus and uncertainty
         consensus_segmentation = self._calculate_consensus(predictions)
         uncertainty_scores = self._calculate_uncertainty_scores(predictions)
         
         return UncertaintyResult(
-            segmentation=consensus_segmentation,
+            segmentation=tuple(consensus_segmentation),
             uncertainty_score=uncertainty_scores['overall'],
             confidence=1.0 - uncertainty_scores['overall'],
-            token_uncertainties=uncertainty_scores['tokens'],
-            boundary_confidence=uncertainty_scores['boundaries'],
-            method="monte_carlo_dropout"
+            token_uncertainties=tuple(uncertainty_scores['tokens']),
+            boundary_confidence=tuple(uncertainty_scores['boundaries']),
+            method=(f"mc_dropout_adaptive_n={n_drawn}" if n_drawn < self.n_samples
+                    else "monte_carlo_dropout")
         )
     
-    def _process_with_dropout(self, text: str) -> Doc:
-        """Process text with dropout enabled during inference"""
+    def _sample_predictions(self, text: str) -> List[Dict]:
+        """Draw up to n_samples dropout predictions, stopping once boundary votes stabilize"""
         
-        # Enable training mode for dropout during inference
-        if hasattr(self.nlp_model, 'get_pipe'):
-            for pipe_name in self.nlp_model.pipe_names:
-                pipe = self.nlp_model.get_pipe(pipe_name)
-                if hasattr(pipe, 'model') and hasattr(pipe.model, 'train'):
-                    pipe.model.train()  # Enable dropout
+        batch_size = self.EARLY_STOP_CHECK if self.early_stop else self.n_samples
+        texts = [text] * self.n_samples
+        boundary_votes = np.zeros(len(text) + 1, dtype=np.int64)
+        predictions = []
         
-        # Process with stochastic behavior
-        doc = self.nlp_model(text)
+        with self._dropout_sampling(), self._autocast(), torch.inference_mode():
+            for doc in self.nlp_model.pipe(texts, batch_size=batch_size):
+                prediction = self._extract_segmentation(doc)
+                predictions.append(prediction)
+                boundary_votes[prediction['boundaries']] += 1
+                
+                n = len(predictions)
+                if (self.early_stop and n >= self.EARLY_STOP_MIN and n < self.n_samples
+                        and n % self.EARLY_STOP_CHECK == 0):
+                    # Variance of each boundary's vote share; stop when all are settled
+                    p = boundary_votes / n
+                    if (p * (1 - p) / n).max() < self.EARLY_STOP_VARIANCE:
+                        break
+        
+        return predictions
+    
+    def _head_activations(self, text: str) -> Optional[Tuple[Doc, np.ndarray, np.ndarray, np.ndarray]]:
+        """One deterministic pass returning the doc, penultimate activations and softmax params"""
+        
+        head = None
+        for pipe_name in self.FAST_DROPOUT_PIPES:
+            if pipe_name in getattr(self.nlp_model, 'pipe_names', []):
+                model = self.nlp_model.get_pipe(pipe_name).model
+                if model.has_ref('tok2vec') and model.has_ref('softmax'):
+                    head = model
+                    break
+        
+        if head is None:
+            return None
+        
+        try:
+            doc = self.nlp_model(text)
+            if len(doc) == 0:
+                return None
+            
+            tok2vec = head.get_ref('tok2vec')
+            softmax = head.get_ref('softmax')
+            ops = head.ops
+            
+            h = ops.to_numpy(tok2vec.predict([doc])[0]).astype(np.float64)
+            W = ops.to_numpy(softmax.get_param('W')).astype(np.float64)
+            b = ops.to_numpy(softmax.get_param('b')).astype(np.float64)
+        except Exception as e:
+            print(f"Single-pass dropout unavailable, using Monte Carlo sampling: {e}")
+            return None
+        
+        return doc, h, W, b
+    
+    @staticmethod
+    def _softmax_entropy(logits: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Softmax over the last axis and its entropy in bits"""
+        
+        logits = logits - logits.max(axis=-1, keepdims=True)
+        probs = np.exp(logits)
+        probs /= probs.sum(axis=-1, keepdims=True)
+        return probs, -(probs * np.log2(np.clip(probs, 1e-12, 1.0))).sum(axis=-1)
+    
+    def _fast_dropout_forward(self, text: str) -> Optional[Tuple[Doc, np.ndarray, int]]:
+        """Deterministic pass plus analytic dropout variance (fast dropout, Wang & Manning)
+        
+        Dropout on the penultimate activations h makes each logit approximately
+        Gaussian with mean mu = W h + b and variance p/(1-p) * sum_i W_i^2 h_i^2.
+        The predictive distribution is approximated with the probit trick
+        softmax(mu / sqrt(1 + pi * var / 8)), giving per-token entropies from
+        one forward pass instead of n_samples stochastic ones.
+        """
+        
+        activations = self._head_activations(text)
+        if activations is None:
+            return None
+        doc, h, W, b = activations
+        
+        p = self.dropout_rate
+        mu = h @ W.T + b
+        var = (p / (1.0 - p)) * ((h * h) @ (W * W).T)
+        
+        # Probit approximation of the expected softmax under Gaussian logits
+        _, token_entropies = self._softmax_entropy(mu / np.sqrt(1.0 + np.pi * var / 8.0))
+        return doc, token_entropies, W.shape[0]
+    
+    def _concrete_dropout_forward(self, text: str) -> Optional[Tuple[Doc, np.ndarray, int]]:
+        """Deterministic pass plus Concrete-relaxed dropout masks on the softmax head (Gal et al.)
+        
+        Drop indicators are relaxed to z = sigmoid((log p - log(1-p) + log u - log(1-u)) / t)
+        with u ~ U(0, 1). Masks are sampled with numpy.random on the cached activations,
+        so the pipeline itself runs once regardless of n_samples.
+        """
+        
+        activations = self._head_activations(text)
+        if activations is None:
+            return None
+        doc, h, W, b = activations
+        
+        p = self.dropout_rate
+        u = self._rng.uniform(1e-7, 1.0 - 1e-7, size=(self.n_samples,) + h.shape)
+        z = 1.0 / (1.0 + np.exp(-(math.log(p) - math.log1p(-p) + np.log(u) - np.log1p(-u))
+                                / self.concrete_temperature))
+        masked = h * (1.0 - z) / (1.0 - p)
+        
+        # Average sampled softmax outputs into the predictive distribution per token
+        sample_probs, _ = self._softmax_entropy(masked @ W.T + b)
+        predictive = sample_probs.mean(axis=0)
+        token_entropies = -(predictive * np.log2(np.clip(predictive, 1e-12, 1.0))).sum(axis=1)
+        return doc, token_entropies, W.shape[0]
+    
+    def _calculate_fast_dropout_scores(self, doc: Doc, token_entropies: np.ndarray,
+                                       n_classes: int) -> Dict[str, float]:
+        """Uncertainty metrics from single-pass per-token predictive entropies"""
+        
+        # Segmentation comes from the deterministic tokenizer, so boundaries are certain
+        boundary_uncertainties = [0.0] * (len(doc) + 1)
+        
+        max_entropy = math.log2(n_classes) if n_classes > 1 else 1.0
+        overall_uncertainty = float(token_entropies.mean()) / max_entropy
+        
+        return {
+            'overall': min(overall_uncertainty, 1.0),
+            'tokens': token_entropies.tolist(),
+            'boundaries': boundary_uncertainties
+        }
+    
+    def _install_dropout_hooks(self) -> List:
+        """Register forward hooks that apply dropout to torch Dropout modules in eval mode
+        
+        Unlike calling .train() on every sample, this leaves normalization layers in
+        inference behaviour and costs nothing outside _dropout_sampling().
+        """
+        
+        def apply_dropout(module, inputs, output):
+            if self._dropout_active:
+                return torch.nn.functional.dropout(inputs[0], module.p, training=True)
+            return output
+        
+        handles = []
+        for pipe_name in getattr(self.nlp_model, 'pipe_names', []):
+            pipe = self.nlp_model.get_pipe(pipe_name)
+            if not hasattr(pipe, 'model') or not hasattr(pipe.model, 'walk'):
+                continue
+            for node in pipe.model.walk():
+                for shim in getattr(node, 'shims', []):
+                    torch_model = getattr(shim, '_model', None)
+                    if not isinstance(torch_model, torch.nn.Module):
+                        continue
+                    for module in torch_model.modules():
+                        if isinstance(module, torch.nn.Dropout):
+                            handles.append(module.register_forward_hook(apply_dropout))
+        return handles
+    
+    @contextmanager
+    def _dropout_sampling(self) -> Iterator[None]:
+        """Force dropout on for the duration of a sampling batch"""
+        self._dropout_active = True
+        try:
+            yield
+        finally:
+            self._dropout_active = False
+    
+    def _autocast(self):
+        """CUDA autocast to self.amp_dtype when a GPU is present, FP32 otherwise"""
+        if torch.cuda.is_available():
+            return torch.autocast(device_type='cuda', dtype=self.amp_dtype)
+        return nullcontext()
+    
+    def _process_with_dropout(self, text: str) -> Doc:
+        """Process text with dropout enabled during inference"""
         
-        return doc
+        with self._dropout_sampling(), self._autocast(), torch.inference_mode():
+            return self.nlp_model(text)
     
     def _extract_segmentation(self, doc: Doc) -> Dict:
         """Extract segmentation information from spaCy doc"""
-        tokens = []
-        
-        for token in doc:
-            token_data = {
-                'surface': token.text,
-                'lemma': token.lemma_,
-                'pos': token.pos_,
-                'tag': token.tag_,
-                'start': token.idx,
-                'end': token.idx + len(token.text),
-                'reading': getattr(token._, 'reading', None) if hasattr(token, '_') else None
-            }
-            tokens.append(token_data)
+        n_tokens = len(doc)
+        surfaces = [token.text for token in doc]
+        starts = np.empty(n_tokens, dtype=np.int32)
+        ends = np.empty(n_tokens, dtype=np.int32)
+        pos_ids = np.empty(n_tokens, dtype=np.int16)
+        
+        for i, token in enumerate(doc):
+            starts[i] = token.idx
+            ends[i] = token.idx + len(token.text)
+            pos_ids[i] = _pos_id(token.pos_)
         
         return {
-            'tokens': tokens,
-            'boundaries': [token['start'] for token in tokens] + [len(doc.text)]
+            'text': doc.text,
+            'surfaces': surfaces,
+            'starts': starts,
+            'ends': ends,
+            'pos_ids': pos_ids,
+            'boundaries': np.concatenate([starts, np.array([len(doc.text)], dtype=np.int32)])
         }
     
     def _calculate_consensus(self, predictions: List[Dict]) -> List[str]:
         """Calculate consensus segmentation from multiple predictions"""
         
         # Count boundary occurrences
-        boundary_votes = defaultdict(int)
-        
-        for pred in predictions:
-            for boundary in pred['boundaries']:
-                boundary_votes[boundary] += 1
+        boundary_votes = np.bincount(np.concatenate([pred['boundaries'] for pred in predictions])) \
+            if predictions else np.zeros(0, dtype=np.int64)
         
         # Select boundaries with majority vote
-        consensus_boundaries = []
-        for boundary, votes in boundary_votes.items():
-            if votes > self.n_samples // 2:  # Majority threshold
-                consensus_boundaries.append(boundary)
-        
-        consensus_boundaries = sorted(set(consensus_boundaries))
+        consensus_boundaries = np.flatnonzero(boundary_votes > len(predictions) // 2).tolist()
         
         # Generate consensus tokens
         if not predictions:
             return []
         
-        text = predictions[0]['tokens'][0]['surface'] if predictions[0]['tokens'] else ""
-        for pred in predictions:
-            if pred['tokens']:
-                full_text = ''.join([t['surface'] for t in pred['tokens']])
-                if len(full_text) > len(text):
-                    text = full_text
-                break
+        text = max((pred['text'] for pred in predictions), key=len)
         
         consensus_tokens = []
         for i in range(len(consensus_boundaries) - 1):
@@ -139,7 +429,7 @@ class MonteCarloDropoutUncertainty:
         
         return consensus_tokens
     
-    def _calculate_uncertainty_scores(self, predictions: List[Dict]) -> Dict[str, float]:
+    def _calculate_uncertainty_scores(self, predictions: List[Dict]) -> Dict[str, Any]:
         """Calculate various uncertainty metrics"""
         
         if not predictions:
@@ -149,17 +439,13 @@ class MonteCarloDropoutUncertainty:
                 'boundaries': []
             }
         
-        # Boundary uncertainty (entropy-based)
-        boundary_votes = defaultdict(int)
-        for pred in predictions:
-            for boundary in pred['boundaries']:
-                boundary_votes[boundary] += 1
-        
-        boundary_uncertainties = []
-        for boundary, votes in boundary_votes.items():
-            prob = votes / self.n_samples
-            entropy = -prob * math.log2(prob) - (1-prob) * math.log2(max(1-prob, 1e-10))
-            boundary_uncertainties.append(entropy)
+        # Boundary uncertainty (entropy-based) over positions that received votes
+        boundary_votes = np.bincount(np.concatenate([pred['boundaries'] for pred in predictions]))
+        votes = boundary_votes[boundary_votes > 0]
+        p = votes / len(predictions)
+        # Binary entropy in bits; xlogy defines 0 * log 0 = 0 without clipping
+        entropy = (0.0 - xlogy(p, p) - xlogy(1 - p, 1 - p)) / np.log(2)
+        boundary_uncertainties = entropy.tolist()
         
         # Token-level uncertainty
         token_uncertainties = self._calculate_token_uncertainties(predictions)
@@ -179,72 +465,48 @@ class MonteCarloDropoutUncertainty:
         if not predictions:
             return []
         
-        # Collect all unique tokens across predictions
-        all_tokens = set()
-        for pred in predictions:
-            for token in pred['tokens']:
-                all_tokens.add(token['surface'])
+        # Index unique surfaces across predictions; POS ids are already interned
+        surface_ids = {}
+        rows = [surface_ids.setdefault(surface, len(surface_ids))
+                for pred in predictions for surface in pred['surfaces']]
         
-        token_uncertainties = []
+        if not rows:
+            return []
         
-        for token_surface in all_tokens:
-            # Count POS tag variations for this token
-            pos_counts = defaultdict(int)
-            total_occurrences = 0
-            
-            for pred in predictions:
-                for token in pred['tokens']:
-                    if token['surface'] == token_surface:
-                        pos_counts[token['pos']] += 1
-                        total_occurrences += 1
-            
-            if total_occurrences > 0:
-                # Calculate entropy of POS distribution
-                entropy = 0.0
-                for count in pos_counts.values():
-                    prob = count / total_occurrences
-                    if prob > 0:
-                        entropy -= prob * math.log2(prob)
-                
-                token_uncertainties.append(entropy)
+        cols = np.concatenate([pred['pos_ids'] for pred in predictions]).astype(np.int64)
+        
+        # (n_unique_tokens, n_pos_tags) count matrix -> POS distribution entropy per token
+        entropy = _pos_entropy(np.asarray(rows, dtype=np.int64), cols,
+                               len(surface_ids), int(cols.max()) + 1)
         
-        return token_uncertainties
+        return entropy.tolist()
 
 class EnsembleUncertainty:
     """Uncertainty estimation using ensemble of different models"""
     
     def __init__(self, models: List):
         self.models = models
+        # spaCy models may share one CUDA stream, so never run the same one concurrently
+        self._model_locks = [threading.Lock() for _ in models]
         
     def estimate_ensemble_uncertainty(self, text: str) -> UncertaintyResult:
         """Estimate uncertainty using model ensemble"""
         
-        predictions = []
-        
-        # Get predictions from all models
-        for model in self.models:
-            try:
-                if hasattr(model, 'tokenize'):
-                    # Traditional tokenizer
-                    tokens = model.tokenize(text)
-                    pred = self._format_tokenizer_output(tokens, text)
-                else:
-                    # spaCy model
-                    doc = model(text)
-                    pred = self._format_spacy_output(doc)
-                
-                predictions.append(pred)
-            except Exception as e:
-                print(f"Model prediction failed: {e}")
-                continue
+        # Get predictions from all models concurrently; tokenizers and torch release the GIL
+        with ThreadPoolExecutor(max_workers=max(len(self.models), 1)) as executor:
+            futures = [
+                executor.submit(self._run_single, model, lock, text)
+                for model, lock in zip(self.models, self._model_locks)
+            ]
+            predictions = [pred for pred in (future.result() for future in futures) if pred is not None]
         
         if not predictions:
             return UncertaintyResult(
-                segmentation=[text],
+                segmentation=(text,),
                 uncertainty_score=1.0,
                 confidence=0.0,
-                token_uncertainties=[1.0],
-                boundary_confidence=[0.0],
+                token_uncertainties=(1.0,),
+                boundary_confidence=(0.0,),
                 method="ensemble_fallback"
             )
         
@@ -253,71 +515,68 @@ class EnsembleUncertainty:
         uncertainty = self._calculate_ensemble_uncertainty(predictions)
         
         return UncertaintyResult(
-            segmentation=consensus,
+            segmentation=tuple(consensus),
             uncertainty_score=uncertainty['overall'],
             confidence=1.0 - uncertainty['overall'],
-            token_uncertainties=uncertainty['tokens'],
-            boundary_confidence=uncertainty['boundaries'],
+            token_uncertainties=tuple(uncertainty['tokens']),
+            boundary_confidence=tuple(uncertainty['boundaries']),
             method="ensemble_uncertainty"
         )
     
-    def _format_tokenizer_output(self, tokens, text: str) -> Dict:
+    def _run_single(self, model, lock: threading.Lock, text: str) -> Optional[Dict]:
+        """Run one ensemble member, returning None if it fails"""
+        
+        try:
+            if hasattr(model, 'tokenize'):
+                # Traditional tokenizer
+                tokens = model.tokenize(text)
+                return self._format_tokenizer_output(tokens, text)
+            
+            # spaCy model
+            with lock:
+                doc = model(text)
+            return self._format_spacy_output(doc)
+        except Exception as e:
+            print(f"Model prediction failed: {e}")
+            return None
+    
+    def _format_tokenizer_output(self, tokens: List[str], text: str) -> Dict:
         """Format traditional tokenizer output"""
-        formatted_tokens = []
+        surfaces = []
+        starts = []
+        ends = []
         current_pos = 0
         
         for token in tokens:
             token_text = str(token)
-            start_pos = text.find(token_text, current_pos)
+            # Tokens are contiguous and in order, so normally the next token starts right here;
+            # only search ahead when the tokenizer skipped characters such as whitespace
+            if text.startswith(token_text, current_pos):
+                start_pos = current_pos
+            else:
+                start_pos = text.find(token_text, current_pos)
             if start_pos != -1:
-                formatted_tokens.append({
-                    'surface': token_text,
-                    'start': start_pos,
-                    'end': start_pos + len(token_text)
-                })
+                surfaces.append(token_text)
+                starts.append(start_pos)
+                ends.append(start_pos + len(token_text))
                 current_pos = start_pos + len(token_text)
         
-        boundaries = [0] + [t['end'] for t in formatted_tokens]
-        
-        return {
-            'tokens': formatted_tokens,
-            'boundaries': boundaries
-        }
+        return _make_prediction(text, surfaces, starts, ends, [''] * len(surfaces), [0] + ends)
     
     def _format_spacy_output(self, doc: Doc) -> Dict:
         """Format spaCy output"""
-        tokens = []
-        
-        for token in doc:
-            tokens.append({
-                'surface': token.text,
-                'start': token.idx,
-                'end': token.idx + len(token.text),
-                'pos': token.pos_,
-                'lemma': token.lemma_
-            })
+        surfaces = [token.text for token in doc]
+        starts = [token.idx for token in doc]
+        ends = [token.idx + len(token.text) for token in doc]
         
-        boundaries = [0] + [t['end'] for t in tokens]
-        
-        return {
-            'tokens': tokens,
-            'boundaries': boundaries
-        }
+        return _make_prediction(doc.text, surfaces, starts, ends, [token.pos_ for token in doc], [0] + ends)
     
     def _calculate_ensemble_consensus(self, predictions: List[Dict]) -> List[str]:
         """Calculate consensus from ensemble predictions"""
         
-        # Use voting-based consensus
-        all_boundaries = set()
-        for pred in predictions:
-            all_boundaries.update(pred['boundaries'])
-        
-        # Count votes for each boundary
-        boundary_votes = defaultdict(int)
-        for boundary in all_boundaries:
-            for pred in predictions:
-                if boundary in pred['boundaries']:
-                    boundary_votes[boundary] += 1
+        # Use voting-based consensus: one vote per prediction per boundary
+        boundary_sets = [set(pred['boundaries'].tolist()) for pred in predictions]
+        boundary_votes = Counter(b for bs in boundary_sets for b in bs)
         
         # Select boundaries with majority vote
         threshold = len(predictions) // 2
@@ -331,12 +590,7 @@ class EnsembleUncertainty:
             return []
         
         # Get original text
-        text = ""
-        for pred in predictions:
-            if pred['tokens']:
-                candidate_text = ''.join([t['surface'] for t in pred['tokens']])
-                if len(candidate_text) > len(text):
-                    text = candidate_text
+        text = max((pred['text'] for pred in predictions), key=len)
         
         # Generate consensus tokens
         consensus_tokens = []
@@ -350,22 +604,17 @@ class EnsembleUncertainty:
         
         return consensus_tokens
     
-    def _calculate_ensemble_uncertainty(self, predictions: List[Dict]) -> Dict[str, float]:
+    def _calculate_ensemble_uncertainty(self, predictions: List[Dict]) -> Dict[str, Any]:
         """Calculate uncertainty metrics for ensemble"""
         
         if not predictions:
             return {'overall': 1.0, 'tokens': [], 'boundaries': []}
         
-        # Calculate boundary disagreement
-        all_boundaries = set()
-        for pred in predictions:
-            all_boundaries.update(pred['boundaries'])
-        
-        boundary_disagreements = []
-        for boundary in all_boundaries:
-            votes = sum(1 for pred in predictions if boundary in pred['boundaries'])
-            disagreement = 1.0 - (votes / len(predictions))
-            boundary_disagreements.append(disagreement)
+        # Calculate boundary disagreement: one vote per prediction per boundary position
+        all_boundaries = np.concatenate([np.unique(pred['boundaries']) for pred in predictions])
+        counts = np.bincount(all_boundaries)
+        positions = np.flatnonzero(counts)
+        boundary_disagreements = (1.0 - counts[positions] / len(predictions)).tolist()
         
         # Calculate token disagreement
         token_disagreements = self._calculate_token_disagreements(predictions)
@@ -385,20 +634,21 @@ class EnsembleUncertainty:
         
         # Compare tokens across predictions
         if len(predictions) < 2:
-            return [0.0] * len(predictions[0]['tokens']) if predictions else []
+            return [0.0] * len(predictions[0]['surfaces']) if predictions else []
         
-        max_tokens = max(len(pred['tokens']) for pred in predictions)
+        max_tokens = max(len(pred['surfaces']) for pred in predictions)
         
-        for i in range(max_tokens):
-            token_surfaces = []
-            for pred in predictions:
-                if i < len(pred['tokens']):
-                    token_surfaces.append(pred['tokens'][i]['surface'])
-            
+        # Column-major view: surfaces at each token position across predictions
+        columns = [
+            [pred['surfaces'][i] for pred in predictions if i < len(pred['surfaces'])]
+            for i in range(max_tokens)
+        ]
+        
+        for token_surfaces in columns:
             if token_surfaces:
                 # Calculate disagreement as fraction of non-matching tokens
-                most_common = max(set(token_surfaces), key=token_surfaces.count)
-                agreement_rate = token_surfaces.count(most_common) / len(token_surfaces)
+                _, most_common_count = Counter(token_surfaces).most_common(1)[0]
+                agreement_rate = most_common_count / len(token_surfaces)
                 disagreement = 1.0 - agreement_rate
                 token_agreements.append(disagreement)
         
@@ -407,36 +657,47 @@ class EnsembleUncertainty:
 class AdaptiveUncertaintyThreshold:
     """Adaptive thresholding for uncertainty-based decisions"""
     
+    HISTORY_SIZE = 100
+    
     def __init__(self, initial_threshold: float = 0.5):
         self.threshold = initial_threshold
-        self.performance_history = []
         self.adaptation_rate = 0.1
         
+        # Ring buffer of (uncertainty, was_correct) rows for the most recent feedback
+        self._buf = np.zeros((self.HISTORY_SIZE, 2), dtype=np.float32)
+        self._idx = 0
+        self._count = 0
+    
+    @property
+    def performance_history(self) -> List[Tuple[float, bool]]:
+        """Recent (uncertainty, was_correct) feedback, oldest first"""
+        order = np.arange(self._idx - self._count, self._idx) % self.HISTORY_SIZE
+        return [(float(u), bool(c)) for u, c in self._buf[order]]
+        
     def should_request_annotation(self, uncertainty: float) -> bool:
         """Determine if annotation is needed based on uncertainty"""
         return uncertainty > self.threshold
     
-    def update_from_feedback(self, uncertainty: float, was_correct: bool):
+    def update_from_feedback(self, uncertainty: float, was_correct: bool) -> None:
         """Update threshold based on feedback"""
         
-        self.performance_history.append((uncertainty, was_correct))
-        
-        # Keep only recent history
-        if len(self.performance_history) > 100:
-            self.performance_history = self.performance_history[-100:]
+        self._buf[self._idx % self.HISTORY_SIZE] = (uncertainty, was_correct)
+        self._idx += 1
+        self._count = min(self._count + 1, self.HISTORY_SIZE)
         
         # Adapt threshold based on performance
-        if len(self.performance_history) >= 10:
+        if self._count >= 10:
             self._adapt_threshold()
     
-    def _adapt_threshold(self):
+    def _adapt_threshold(self) -> None:
         """Adapt threshold based on recent performance"""
         
         # Calculate precision at current threshold
-        above_threshold = [(u, c) for u, c in self.performance_history if u > self.threshold]
+        buf = self._buf[:self._count]
+        above_threshold = buf[:, 0] > self.threshold
         
-        if above_threshold:
-            precision = sum(1 for _, correct in above_threshold if not correct) / len(above_threshold)
+        if above_threshold.any():
+            precision = 1.0 - float(buf[above_threshold, 1].mean())
             
             # Adjust threshold based on precision
             if precision < 0.5:  # Too many false positives
@@ -445,4 +706,4 @@ class AdaptiveUncertaintyThreshold:
                 self.threshold -= self.adaptation_rate
             
             # Keep threshold in reasonable bounds
-            self.threshold = max(0.1, min(0.9, self.threshold))
\ No newline at end of file
+            self.threshold = max(0.1, min(0.9, self.threshold))
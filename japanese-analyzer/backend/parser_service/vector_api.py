@@ -4,19 +4,42 @@ Vector Database API Endpoints
 Provides semantic search and embedding capabilities via FastAPI
 """
 
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Request
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional
 import logging
 import time
+from datetime import datetime
 
 from embedding_service import embedding_service
 from vector_database import vector_db_manager
 
+# Optional cachetools for the search response cache
+try:
+    from cachetools import TTLCache
+    CACHETOOLS_AVAILABLE = True
+except ImportError:
+    CACHETOOLS_AVAILABLE = False
+
+# orjson serializes float-heavy responses (embeddings) in C; ORJSONResponse requires it
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 # Create router for vector API endpoints
-vector_router = APIRouter(prefix="/vector", tags=["vector"])
+vector_router = APIRouter(
+    prefix="/vector",
+    tags=["vector"],
+    default_response_class=ORJSONResponse if ORJSON_AVAILABLE else JSONResponse
+)
+
+# Recent search results, keyed by vector_db_manager.generation so a completed vectorization run misses them
+search_cache = TTLCache(maxsize=4096, ttl=600) if CACHETOOLS_AVAILABLE else None
 
 # Pydantic models for API requests/responses
 
@@ -25,6 +48,7 @@ class SemanticSearchRequest(BaseModel):
     top_k: int = Field(default=10, ge=1, le=50, description="Number of results to return")
     pos_filter: Optional[List[str]] = Field(default=None, description="Filter by parts of speech")
     similarity_threshold: float = Field(default=0.6, ge=0.0, le=1.0, description="Minimum similarity threshold")
+    nprobe: Optional[int] = Field(default=None, ge=1, le=256, description="IVF lists probed per query (higher = better recall, slower)")
 
 class SemanticSearchResult(BaseModel):
     word: str
@@ -101,13 +125,28 @@ async def semantic_search(request: SemanticSearchRequest):
         
         start_time = time.time()
         
-        # Perform semantic search
-        results = await vector_db_manager.semantic_word_search(
-            query=request.query,
-            top_k=request.top_k,
-            pos_filter=request.pos_filter,
-            similarity_threshold=request.similarity_threshold
+        query = request.query.strip()
+        cache_key = (
+            vector_db_manager.generation,
+            query,
+            request.top_k,
+            tuple(request.pos_filter or ()),
+            round(request.similarity_threshold, 3),
+            request.nprobe
         )
+        results = search_cache.get(cache_key) if search_cache is not None else None
+        
+        if results is None:
+            # Perform semantic search
+            results = await vector_db_manager.semantic_word_search(
+                query=query,
+                top_k=request.top_k,
+                pos_filter=request.pos_filter,
+                similarity_threshold=request.similarity_threshold,
+                nprobe=request.nprobe
+            )
+            if search_cache is not None:
+                search_cache[cache_key] = results
         
         search_time_ms = (time.time() - start_time) * 1000
         
@@ -187,11 +226,13 @@ async def generate_embedding(request: EmbeddingRequest):
         raise HTTPException(status_code=500, detail=f"Embedding generation failed: {str(e)}")
 
 @vector_router.post("/embed-batch", response_model=BatchEmbeddingResponse)
-async def generate_batch_embeddings(request: BatchEmbeddingRequest):
+async def generate_batch_embeddings(request: BatchEmbeddingRequest, http_request: Request):
     """
     Generate embedding vectors for multiple texts
     
-    More efficient than individual requests for multiple texts.
+    More efficient than individual requests for multiple texts. Clients sending
+    `Accept: application/octet-stream` get the raw little-endian row-major matrix
+    instead of JSON (shape in X-Shape); add `X-Dtype: float16` for half precision.
     """
     try:
         # Validate batch size
@@ -210,15 +251,28 @@ async def generate_batch_embeddings(request: BatchEmbeddingRequest):
         embeddings = await embedding_service.embed_batch(request.texts)
         
         # Validate embeddings were generated
-        if not embeddings or len(embeddings) == 0:
+        if embeddings.size == 0:
             raise HTTPException(status_code=500, detail="Failed to generate embeddings")
         
-        # Safely get dimension from first embedding
-        dimension = len(embeddings[0]) if embeddings and len(embeddings[0]) > 0 else 0
+        dimension = embeddings.shape[1]
+        
+        # Binary path: one buffer copy instead of per-float validation and JSON encoding
+        if 'application/octet-stream' in http_request.headers.get('accept', ''):
+            dtype = 'float16' if http_request.headers.get('x-dtype') == 'float16' else 'float32'
+            matrix = embeddings.astype('<f2' if dtype == 'float16' else '<f4', copy=False)
+            return Response(
+                content=matrix.tobytes(),
+                media_type='application/octet-stream',
+                headers={
+                    'X-Shape': f'{len(embeddings)},{dimension}',
+                    'X-Dtype': dtype,
+                    'X-Model': embedding_service.model_name
+                }
+            )
         
         return BatchEmbeddingResponse(
             texts=request.texts,
-            embeddings=embeddings,
+            embeddings=embeddings.tolist(),
             dimension=dimension,
             model_name=embedding_service.model_name,
             batch_size=len(request.texts)
@@ -339,15 +393,15 @@ async def get_vector_stats():
             "vector_database": await vector_db_manager.get_vectorization_status()
         }
         
-        # Add collection stats if available
+        # Add collection stats if available (in-process counters, no collection query)
         if embedding_service.collection:
-            collection_stats = await embedding_service.get_collection_stats()
+            snapshot = embedding_service.snapshot()
             stats["collection"] = {
-                "total_embeddings": collection_stats.total_embeddings,
-                "database_size_mb": collection_stats.database_size_mb,
-                "embedding_dimension": collection_stats.embedding_dimension,
-                "model_name": collection_stats.model_name,
-                "last_updated": collection_stats.last_updated.isoformat()
+                "total_embeddings": snapshot["total_vectors"],
+                "database_size_mb": snapshot["db_size_mb"],
+                "embedding_dimension": snapshot["embedding_dimension"],
+                "model_name": snapshot["model_name"],
+                "last_updated": datetime.now().isoformat()
             }
         
         return stats
@@ -8,20 +8,94 @@ import asyncio
 import sqlite3
 import json
 import logging
-from typing import List, Dict, Any, Optional, Tuple
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
 from pathlib import Path
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 import time
 import os
+import hashlib
+import threading
+
+import numpy as np
 
 from embedding_service import embedding_service, SimilarityResult
 
+# Optional FAISS for the product-quantized search path
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
+# Optional orjson for faster parsing of the JSON dictionary columns
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+_json_loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+
+# Optional SimSIMD for SIMD cosine kernels
+try:
+    import simsimd
+    SIMSIMD_AVAILABLE = True
+except ImportError:
+    SIMSIMD_AVAILABLE = False
+
+# Numba is optional: without it the JIT-decorated kernels run as plain Python/NumPy
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+    def njit(*args, **kwargs):
+        def decorator(func):
+            return func
+        return decorator
+
 logger = logging.getLogger(__name__)
 
+def _cosine_similarities(query: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    """Cosine similarity of one query vector against every row of matrix"""
+    query = np.ascontiguousarray(query, dtype=np.float32)
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    
+    if SIMSIMD_AVAILABLE:
+        return 1.0 - np.asarray(simsimd.cdist(query[None, :], matrix, metric='cosine'), dtype=np.float32)[0]
+    
+    # Single BLAS GEMV, normalized afterwards
+    norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+    return (matrix @ query) / np.maximum(norms, 1e-12)
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _rerank_top_k(query: np.ndarray, matrix: np.ndarray, rows: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Dot products of unit query against matrix[rows], returning the k best (rows, scores) best-first"""
+    n = rows.shape[0]
+    scores = np.empty(n, dtype=np.float32)
+    for i in prange(n):
+        row = matrix[rows[i]]
+        acc = np.float32(0.0)
+        for j in range(row.shape[0]):
+            acc += row[j] * query[j]
+        scores[i] = acc
+    
+    order = np.argsort(-scores)[:k]
+    return rows[order], scores[order]
+
 @dataclass
+class VectorizationReport:
+    """Summary of a vectorization run, filled from counters kept during the run"""
+    processed: int
+    duration: float
+    db_size_mb: float
+    cache_hit_rate: float
+
+@dataclass(slots=True, frozen=True)
 class DictionaryEntry:
-    """Dictionary entry for vectorization"""
+    """Dictionary entry for vectorization; searchable_text is computed once at construction"""
     word: str
     reading: str
     definitions: List[str]
@@ -29,6 +103,34 @@ class DictionaryEntry:
     frequency: Optional[int] = None
     jlpt_level: Optional[str] = None
     metadata: Optional[Dict[str, Any]] = None
+    searchable_text: str = field(init=False)
+    
+    def __post_init__(self):
+        # Text embedded for the entry: word, reading and the first three definitions
+        object.__setattr__(self, 'searchable_text',
+                           f"{self.word} {self.reading} {' '.join(self.definitions[:3])}")
+    
+    def to_metadata(self) -> Dict[str, Any]:
+        """Chroma metadata for this entry"""
+        metadata = {
+            'word': self.word,
+            'reading': self.reading,
+            'definitions': self.definitions,
+            'pos': self.pos,
+            'type': 'dictionary_entry',
+            'source': 'jmdict',
+            'searchable_text': self.searchable_text
+        }
+        
+        # Add optional fields
+        if self.frequency:
+            metadata['frequency'] = self.frequency
+        if self.jlpt_level:
+            metadata['jlpt_level'] = self.jlpt_level
+        if self.metadata:
+            metadata.update(self.metadata)
+        
+        return metadata
 
 class VectorDatabaseManager:
     """
@@ -39,8 +141,42 @@ class VectorDatabaseManager:
     - Semantic search capabilities
     - Batch processing for performance
     - Progress tracking for large datasets
+    - Product-quantized index with exact rerank (requires faiss)
     """
     
+    # PQ codes: up to PQ_SUBQUANTIZERS bytes per vector, codebooks trained on PQ_TRAIN_SIZE samples
+    PQ_SUBQUANTIZERS = 96
+    PQ_TRAIN_SIZE = 131072
+    PQ_RERANK_FACTOR = 4
+    
+    # Dictionary batches embedded concurrently during vectorization
+    MAX_CONCURRENT_BATCHES = 8
+    
+    # Max digests per SQL IN (...) lookup against the embedding cache
+    CACHE_LOOKUP_CHUNK = 500
+    
+    # Vectors per Chroma add() during vectorization; batches are buffered up to this size
+    BULK_INSERT_SIZE = 5000
+    
+    # Persist progress every N batches; cache status snapshots for STATUS_TTL seconds
+    PROGRESS_PERSIST_EVERY = 10
+    
+    # Commit a resume checkpoint after every N dictionary windows
+    CHECKPOINT_EVERY_WINDOWS = 10
+    STATUS_TTL = 1.0
+    
+    # Up to this many rows, one exact GEMV over the packed matrix replaces the HNSW query
+    EXACT_SEARCH_MAX_ROWS = 50000
+    
+    # IVF-Flat coarse index up to PQ_MIN_ROWS rows: ~sqrt(N) lists, IVF_NPROBE probed per query
+    IVF_MAX_LISTS = 4096
+    IVF_NPROBE = 8
+    IVF_TRAIN_SIZE = 131072
+    
+    # Above this many rows IVF-Flat's second full-precision copy costs too much memory;
+    # the PQ index (PQ_SUBQUANTIZERS bytes per row) serves those dictionaries instead
+    PQ_MIN_ROWS = 500000
+    
     def __init__(self, dictionary_db_path: Optional[str] = None):
         # Use absolute path resolution for dictionary database
         if dictionary_db_path is None:
@@ -58,70 +194,231 @@ class VectorDatabaseManager:
             'last_update': None,
             'status': 'not_started'
         }
+        
+        # Progress survives restarts; status polls share a snapshot refreshed at most once per STATUS_TTL
+        self.progress_path = str(Path(self.dictionary_db_path).with_suffix('.progress.json'))
+        self.checkpoint_path = str(Path(self.dictionary_db_path).with_suffix('.ckpt'))
+        self._load_progress()
+        self._status_snapshot: Optional[Dict[str, Any]] = None
+        self._status_time = 0.0
+        
+        # Packed (N, D) L2-normalized dictionary embeddings plus their doc ids, mmapped on cold start
+        self.matrix_path = str(Path(self.dictionary_db_path).with_suffix('.vectors.npy'))
+        self.matrix_ids_path = str(Path(self.dictionary_db_path).with_suffix('.ids.npy'))
+        self._load_matrix()
+        self._reset_staged_matrix()
+        
+        # Bumped whenever a completed run replaces the searchable data; keys result caches
+        self.generation = 0
+        self.ivf_index_path = str(Path(self.dictionary_db_path).with_suffix('.ivf'))
+        self.ivf_index = self._load_ivf_index()
+        
+        # Compressed mirror of the packed matrix, persisted beside dictionary.sqlite
+        self.pq_index_path = str(Path(self.dictionary_db_path).with_suffix('.pq'))
+        self.pq_index = self._load_pq_index()
+        
+        # FP32 embeddings keyed by a digest of (model, searchable text), reused across runs
+        self.embedding_cache_path = str(Path(self.dictionary_db_path).with_suffix('.emb.sqlite'))
+        self._embedding_cache_ready = False
+        self._embedding_cache_hits = 0
+        self._embedding_cache_misses = 0
+        self.last_report: Optional[VectorizationReport] = None
+        
+        # One read-only dictionary connection reused across loads (opened lazily)
+        self._dictionary_conn: Optional[sqlite3.Connection] = None
+        self._dictionary_conn_lock = threading.Lock()
+        
+        # Whether the flattened entries table in the sidecar is usable (None until first checked)
+        self._flat_table_ready: Optional[bool] = None
+        self._flat_table_lock = threading.Lock()
+        
+        # Processed batches waiting for the next bulk Chroma insert: (ids, embeddings, metadatas, texts)
+        self._insert_buffer: List[Tuple[List[str], np.ndarray, List[Dict[str, Any]], List[str]]] = []
+        self._insert_buffered = 0
+        self._start_id: Optional[int] = None
     
-    async def vectorize_dictionary(self, batch_size: int = 100, max_entries: Optional[int] = None):
+    async def vectorize_dictionary(self, batch_size: int = 100, max_entries: Optional[int] = None,
+                                   max_concurrent_batches: Optional[int] = None,
+                                   start_id: Optional[int] = None) -> VectorizationReport:
         """
         Vectorize the existing dictionary database
         
         Args:
             batch_size: Number of entries to process in each batch
             max_entries: Maximum number of entries to process (for testing)
+            max_concurrent_batches: Batches in flight at once (defaults to MAX_CONCURRENT_BATCHES)
+            start_id: Resume checkpoint; entries with ent_seq <= start_id are not re-inserted
+            
+        Returns:
+            Report of the run
+        """
+        async for _ in self.vectorize_dictionary_stream(batch_size, max_entries, max_concurrent_batches, start_id):
+            pass
+        return self.last_report
+    
+    async def vectorize_dictionary_stream(self, batch_size: int = 100, max_entries: Optional[int] = None,
+                                          max_concurrent_batches: Optional[int] = None,
+                                          start_id: Optional[int] = None
+                                          ) -> AsyncIterator[Tuple[int, int]]:
+        """
+        Vectorize the dictionary, yielding (processed, total) entry counts as batches finish
+        
+        The first item is (0, total) once the entries are counted. Closing the
+        generator early cancels the batches still in flight. A completed run
+        leaves its VectorizationReport in last_report.
+        
+        The packed matrix and its IVF/PQ indexes are rebuilt in staging and
+        replace the live ones only when a full run completes, so searches
+        during a run keep using the previous complete set. Runs limited by
+        max_entries never replace them.
+        
+        Every CHECKPOINT_EVERY_WINDOWS windows the run drains, flushes to Chroma and
+        records the last ent_seq in checkpoint_path. Passing that value back as
+        start_id skips re-inserting those entries; they are still read back from the
+        embedding cache so the packed matrix and PQ/IVF indexes stay complete.
         """
         logger.info("Starting dictionary vectorization process")
+        tasks = set()
+        start_time = time.perf_counter()
         
         try:
             # Check if embedding service is ready
             if not embedding_service.model or not embedding_service.collection:
                 raise RuntimeError("Embedding service not initialized")
             
-            # Get dictionary entries
-            entries = await self._load_dictionary_entries(max_entries)
+            # Rebuild the packed matrix alongside the collection, off to the side of the live one
+            self._reset_staged_matrix()
+            self._embedding_cache_hits = 0
+            self._embedding_cache_misses = 0
+            self._insert_buffer = []
+            self._insert_buffered = 0
+            self._start_id = start_id
+            
+            total_entries = await asyncio.to_thread(self._count_dictionary_entries, max_entries)
             
             self.vectorization_progress.update({
-                'total_entries': len(entries),
+                'total_entries': total_entries,
                 'processed_entries': 0,
                 'start_time': datetime.now(),
                 'status': 'processing'
             })
+            self._status_snapshot = None
+            
+            logger.info(f"Processing {total_entries} dictionary entries in batches of {batch_size}")
+            yield 0, total_entries
             
-            logger.info(f"Processing {len(entries)} dictionary entries in batches of {batch_size}")
+            # Overlap embedding of several batches, bounded by max_concurrent_batches;
+            # the producer waits on the semaphore so only a few windows are in memory
+            max_concurrent_batches = max_concurrent_batches or self.MAX_CONCURRENT_BATCHES
+            semaphore = asyncio.Semaphore(max_concurrent_batches)
+            progress_lock = asyncio.Lock()
+            batches_done = 0
+            
+            async def process_with_semaphore(batch: List[DictionaryEntry]):
+                try:
+                    await self._process_dictionary_batch(batch)
+                finally:
+                    semaphore.release()
+                
+                async with progress_lock:
+                    # Update progress
+                    self.vectorization_progress['processed_entries'] += len(batch)
+                    self.vectorization_progress['last_update'] = datetime.now()
+                    
+                    # Log progress
+                    processed = self.vectorization_progress['processed_entries']
+                    progress_pct = (processed / total_entries) * 100 if total_entries else 100.0
+                    logger.info(f"Vectorization progress: {progress_pct:.1f}% ({processed}/{total_entries})")
+                    
+                    nonlocal batches_done
+                    batches_done += 1
+                    if batches_done % self.PROGRESS_PERSIST_EVERY == 0:
+                        await asyncio.to_thread(self._persist_progress)
             
-            # Process in batches
-            for i in range(0, len(entries), batch_size):
-                batch = entries[i:i + batch_size]
-                await self._process_dictionary_batch(batch)
+            window_size = batch_size * max_concurrent_batches
+            windows_done = 0
+            async for window in self._iter_dictionary_batches(window_size, max_entries):
+                # Windows arrive in ent_seq order; remember the watermark before reordering
+                window_last_id = int(window[-1].metadata['ent_seq'])
                 
-                # Update progress
-                self.vectorization_progress['processed_entries'] = min(i + batch_size, len(entries))
-                self.vectorization_progress['last_update'] = datetime.now()
+                # Length-sorted batches keep padding in each embedder forward pass small
+                window.sort(key=lambda entry: len(entry.searchable_text))
                 
-                # Log progress
-                progress_pct = (self.vectorization_progress['processed_entries'] / len(entries)) * 100
-                logger.info(f"Vectorization progress: {progress_pct:.1f}% ({self.vectorization_progress['processed_entries']}/{len(entries)})")
+                for i in range(0, len(window), batch_size):
+                    await semaphore.acquire()
+                    
+                    # Surface failures from finished batches before queueing more work
+                    done = [task for task in tasks if task.done()]
+                    for task in done:
+                        tasks.discard(task)
+                        task.result()
+                    if done:
+                        yield self.vectorization_progress['processed_entries'], total_entries
+                    
+                    tasks.add(asyncio.create_task(process_with_semaphore(window[i:i + batch_size])))
                 
-                # Small delay to prevent overwhelming the system
-                await asyncio.sleep(0.1)
+                windows_done += 1
+                if windows_done % self.CHECKPOINT_EVERY_WINDOWS == 0:
+                    # Everything up to this window must be in Chroma before it is checkpointed
+                    if tasks:
+                        await asyncio.wait(tasks)
+                        for task in tasks:
+                            task.result()
+                        tasks = set()
+                        yield self.vectorization_progress['processed_entries'], total_entries
+                    await self._flush_insert_buffer()
+                    await asyncio.to_thread(self._write_checkpoint, window_last_id)
+            
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task.result()
+                yield self.vectorization_progress['processed_entries'], total_entries
+            
+            await self._flush_insert_buffer()
+            
+            # Publish the rebuilt matrix and its indexes together; a partial matrix
+            # would make exact search skip every entry the limited run did not cover
+            if not max_entries:
+                matrix, ids = self._staged_matrix[:self._staged_size], self._staged_ids
+                # Index training and the file writes run off the event loop
+                await asyncio.to_thread(self._save_matrix, matrix, ids)
+                ivf_index = await asyncio.to_thread(self._build_ivf_index, matrix)
+                pq_index = await asyncio.to_thread(self._build_pq_index, matrix, ids)
+                self._matrix, self._matrix_ids = self._staged_matrix, ids
+                self._matrix_size, self._matrix_rows = self._staged_size, self._staged_rows
+                self.ivf_index, self.pq_index = ivf_index, pq_index
+                self.generation += 1
             
             self.vectorization_progress['status'] = 'completed'
+            self._persist_progress()
+            self._clear_checkpoint()
             logger.info("Dictionary vectorization completed successfully")
             
+            lookups = self._embedding_cache_hits + self._embedding_cache_misses
+            self.last_report = VectorizationReport(
+                processed=self.vectorization_progress['processed_entries'],
+                duration=time.perf_counter() - start_time,
+                db_size_mb=self._directory_size(embedding_service.db_path) / (1024 * 1024),
+                cache_hit_rate=self._embedding_cache_hits / lookups if lookups else 0.0
+            )
+            
         except Exception as e:
             self.vectorization_progress['status'] = 'error'
+            self._persist_progress()
             logger.error(f"Dictionary vectorization failed: {e}")
             raise
-    
-    async def _load_dictionary_entries(self, max_entries: Optional[int] = None) -> List[DictionaryEntry]:
-        """Load dictionary entries from SQLite database"""
-        entries = []
         
-        try:
-            # Connect to dictionary database
-            conn = sqlite3.connect(self.dictionary_db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            # Query to get dictionary entries with their senses
-            query = """
+        finally:
+            for task in tasks:
+                task.cancel()
+            self._reset_staged_matrix()
+            if self.vectorization_progress['status'] == 'processing':
+                self.vectorization_progress['status'] = 'interrupted'
+                self._persist_progress()
+    
+    # Entries with their senses; one row per (entry, sense)
+    DICTIONARY_QUERY = """
             SELECT DISTINCT
                 e.kanji_elements,
                 e.reading_elements,
@@ -131,108 +428,403 @@ class VectorDatabaseManager:
             FROM entries e
             LEFT JOIN senses s ON e.ent_seq = s.ent_seq
             WHERE s.glosses IS NOT NULL
+            ORDER BY e.ent_seq
             """
+    
+    # Separator for the flattened gloss/POS lists (ASCII unit separator)
+    FLAT_SEPARATOR = "\x1f"
+    
+    # JSON1 flattening of the same rows so streaming needs no json parsing. It lives in the
+    # .emb.sqlite sidecar (dictionary.sqlite belongs to build-database.js), rebuilt when the
+    # dictionary file changes
+    FLAT_TABLE_DDL = """
+            CREATE TABLE entries_flat AS
+            SELECT * FROM (
+                SELECT DISTINCT
+                    e.ent_seq AS ent_seq,
+                    COALESCE(json_extract(e.kanji_elements, '$[0]'),
+                             json_extract(e.reading_elements, '$[0]')) AS word,
+                    COALESCE(json_extract(e.reading_elements, '$[0]'),
+                             json_extract(e.kanji_elements, '$[0]')) AS reading,
+                    (SELECT group_concat(value, char(31)) FROM json_each(s.glosses)) AS glosses_joined,
+                    (SELECT group_concat(value, char(31)) FROM json_each(s.parts_of_speech)) AS pos_joined,
+                    e.kanji_elements,
+                    e.reading_elements
+                FROM dictionary.entries e
+                JOIN dictionary.senses s ON e.ent_seq = s.ent_seq
+                WHERE s.glosses IS NOT NULL
+            )
+            WHERE word IS NOT NULL AND word != '' AND glosses_joined IS NOT NULL
+            """
+    
+    FLAT_QUERY = """
+            SELECT ent_seq, word, reading, glosses_joined, pos_joined, kanji_elements, reading_elements
+            FROM flat.entries_flat
+            ORDER BY ent_seq
+            """
+    
+    def _ensure_flat_table(self) -> bool:
+        """Build entries_flat in the sidecar on first use; False keeps the JSON-parsing query"""
+        with self._flat_table_lock:
+            if self._flat_table_ready is None and os.path.exists(self.dictionary_db_path):
+                self._build_flat_table()
+            # No dictionary yet: unavailable for now, rechecked on the next call
+            return bool(self._flat_table_ready)
+    
+    def _build_flat_table(self):
+        """Refresh entries_flat in the sidecar if the dictionary changed, then attach it for reads"""
+        try:
+            stat = os.stat(self.dictionary_db_path)
+            source = (stat.st_mtime_ns, stat.st_size)
+            conn = sqlite3.connect(self.embedding_cache_path, timeout=30, uri=True)
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("CREATE TABLE IF NOT EXISTS entries_flat_source (mtime_ns INTEGER, size INTEGER)")
+                if conn.execute("SELECT mtime_ns, size FROM entries_flat_source").fetchone() != source:
+                    # The dictionary is only read: mode=ro is attached, never written or created
+                    conn.execute("ATTACH DATABASE ? AS dictionary",
+                                 (f"{Path(self.dictionary_db_path).as_uri()}?mode=ro",))
+                    with conn:
+                        conn.execute("DROP TABLE IF EXISTS entries_flat")
+                        conn.execute(self.FLAT_TABLE_DDL)
+                        # Streams are ent_seq-ordered so resume checkpoints are watermarks
+                        conn.execute("CREATE INDEX entries_flat_ent_seq ON entries_flat(ent_seq)")
+                        conn.execute("DELETE FROM entries_flat_source")
+                        conn.execute("INSERT INTO entries_flat_source VALUES (?, ?)", source)
+                    conn.execute("DETACH DATABASE dictionary")
+            finally:
+                conn.close()
             
-            if max_entries:
-                query += f" LIMIT {max_entries}"
-            
-            cursor.execute(query)
-            rows = cursor.fetchall()
-            
-            logger.info(f"Loaded {len(rows)} dictionary entries from database")
-            
-            # Process rows into DictionaryEntry objects
-            for row in rows:
-                try:
-                    # Parse JSON fields
-                    kanji_elements = json.loads(row['kanji_elements']) if row['kanji_elements'] else []
-                    reading_elements = json.loads(row['reading_elements']) if row['reading_elements'] else []
-                    glosses = json.loads(row['glosses']) if row['glosses'] else []
-                    pos = json.loads(row['parts_of_speech']) if row['parts_of_speech'] else []
-                    
-                    # Extract primary word and reading
-                    word = kanji_elements[0] if kanji_elements else (reading_elements[0] if reading_elements else "")
-                    reading = reading_elements[0] if reading_elements else word
-                    
-                    # Skip entries without valid word
-                    if not word or not glosses:
-                        continue
-                    
-                    # Create entry
-                    entry = DictionaryEntry(
-                        word=word,
-                        reading=reading,
-                        definitions=glosses,
-                        pos=pos,
-                        metadata={
-                            'ent_seq': row['ent_seq'],
-                            'kanji_variants': kanji_elements,
-                            'reading_variants': reading_elements,
-                            'source': 'jmdict'
-                        }
-                    )
-                    
-                    entries.append(entry)
-                    
-                except (json.JSONDecodeError, IndexError, KeyError) as e:
-                    logger.warning(f"Failed to parse dictionary row {row['ent_seq']}: {e}")
-                    continue
-            
-            conn.close()
+            # Attach to an already-open dictionary connection; later ones attach when opened
+            with self._dictionary_conn_lock:
+                if self._dictionary_conn is not None:
+                    self._attach_flat_table(self._dictionary_conn)
+                self._flat_table_ready = True
+        except sqlite3.Error as e:
+            logger.warning(f"Could not build entries_flat, parsing JSON columns instead: {e}")
+            self._flat_table_ready = False
+    
+    def _attach_flat_table(self, conn: sqlite3.Connection):
+        """Attach the sidecar holding entries_flat as schema flat; query_only still covers it"""
+        conn.execute("ATTACH DATABASE ? AS flat", (self.embedding_cache_path,))
+    
+    def _dictionary_query(self, max_entries: Optional[int] = None) -> str:
+        """Dictionary entry query, optionally limited"""
+        query = self.FLAT_QUERY if self._ensure_flat_table() else self.DICTIONARY_QUERY
+        if max_entries:
+            query += f" LIMIT {int(max_entries)}"
+        return query
+    
+    # Let the OS page cache serve the dictionary file directly (1 GiB window), ~200 MB page cache
+    DICTIONARY_MMAP_SIZE = 1 << 30
+    DICTIONARY_CACHE_KIB = 200000
+    
+    def _dictionary_connection(self) -> sqlite3.Connection:
+        """Shared read-only, memory-mapped connection, opened on first use and usable from worker threads"""
+        with self._dictionary_conn_lock:
+            if self._dictionary_conn is None:
+                conn = sqlite3.connect(f"{Path(self.dictionary_db_path).as_uri()}?mode=ro", uri=True,
+                                       check_same_thread=False)
+                conn.row_factory = sqlite3.Row
+                conn.execute(f"PRAGMA mmap_size={self.DICTIONARY_MMAP_SIZE}")
+                conn.execute(f"PRAGMA cache_size=-{self.DICTIONARY_CACHE_KIB}")
+                conn.execute("PRAGMA query_only=1")
+                if self._flat_table_ready:
+                    self._attach_flat_table(conn)
+                self._dictionary_conn = conn
+            return self._dictionary_conn
+    
+    def warm_up(self):
+        """
+        Compile the JIT rerank kernel once so the first search does not pay for it
+        
+        Call from the main thread at startup: searches run the kernel in worker
+        threads, and Numba's thread pool must not be first launched from one.
+        """
+        if NUMBA_AVAILABLE:
+            matrix = np.zeros((2, 4), dtype=np.float32)
+            _rerank_top_k(matrix[0], matrix, np.arange(2, dtype=np.int64), 1)
             
+            # The mmapped matrix is read-only, which Numba specializes separately
+            query = np.zeros(4, dtype=np.float32)
+            matrix.setflags(write=False)
+            _rerank_top_k(query, matrix, np.arange(2, dtype=np.int64), 1)
+    
+    async def warm_query_cache(self, top_k: int = 5000, extra_queries: Tuple[str, ...] = ()) -> int:
+        """Pre-embed the most common headwords (plus extra_queries) into the query cache"""
+        headwords = await asyncio.to_thread(self._common_headwords, top_k)
+        warmed = await embedding_service.warm_query_cache(list(dict.fromkeys([*extra_queries, *headwords])))
+        logger.info(f"Warmed query cache with {warmed} embeddings")
+        return warmed
+    
+    def _common_headwords(self, limit: int) -> List[str]:
+        """Headwords ranked by sense count, a frequency proxy since the dictionary has no frequency data"""
+        if not self._ensure_flat_table():
+            return []
+        try:
+            rows = self._dictionary_connection().execute(
+                "SELECT word FROM flat.entries_flat GROUP BY ent_seq ORDER BY COUNT(*) DESC, ent_seq LIMIT ?",
+                (int(limit),)
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not rank dictionary headwords: {e}")
+            return []
+        return [row[0] for row in rows]
+    
+    def close(self):
+        """Close the shared dictionary connection"""
+        with self._dictionary_conn_lock:
+            if self._dictionary_conn is not None:
+                self._dictionary_conn.close()
+                self._dictionary_conn = None
+    
+    def _count_dictionary_entries(self, max_entries: Optional[int] = None) -> int:
+        """Count the rows the dictionary query will stream"""
+        query = self._dictionary_query(max_entries)
+        return self._dictionary_connection().execute(f"SELECT COUNT(*) FROM ({query})").fetchone()[0]
+    
+    def _open_dictionary_cursor(self, max_entries: Optional[int] = None) -> sqlite3.Cursor:
+        """Start the dictionary query on the shared connection"""
+        query = self._dictionary_query(max_entries)
+        return self._dictionary_connection().execute(query)
+    
+    async def _iter_dictionary_batches(self, batch_size: int,
+                                       max_entries: Optional[int] = None) -> AsyncIterator[List[DictionaryEntry]]:
+        """Stream dictionary entries from SQLite in batches, with all sqlite work off the event loop"""
+        try:
+            cursor = await asyncio.to_thread(self._open_dictionary_cursor, max_entries)
         except Exception as e:
             logger.error(f"Failed to load dictionary entries: {e}")
             raise
         
+        try:
+            while True:
+                rows = await asyncio.to_thread(cursor.fetchmany, batch_size)
+                if not rows:
+                    break
+                
+                entries = self._flat_rows_to_entries(rows) if self._flat_table_ready else self._rows_to_entries(rows)
+                if entries:
+                    yield entries
+        finally:
+            cursor.close()
+    
+    def _flat_rows_to_entries(self, rows: List[sqlite3.Row]) -> List[DictionaryEntry]:
+        """Convert entries_flat rows; variant columns stay as raw JSON text"""
+        separator = self.FLAT_SEPARATOR
+        return [
+            DictionaryEntry(
+                word=row['word'],
+                reading=row['reading'],
+                definitions=row['glosses_joined'].split(separator),
+                pos=row['pos_joined'].split(separator) if row['pos_joined'] else [],
+                metadata={
+                    'ent_seq': row['ent_seq'],
+                    'kanji_variants': row['kanji_elements'] or '[]',
+                    'reading_variants': row['reading_elements'] or '[]',
+                    'source': 'jmdict'
+                }
+            )
+            for row in rows
+        ]
+    
+    def _rows_to_entries(self, rows: List[sqlite3.Row]) -> List[DictionaryEntry]:
+        """Convert dictionary rows into DictionaryEntry objects, skipping unusable rows"""
+        entries = []
+        
+        for row in rows:
+            try:
+                # Parse JSON fields
+                kanji_elements = _json_loads(row['kanji_elements']) if row['kanji_elements'] else []
+                reading_elements = _json_loads(row['reading_elements']) if row['reading_elements'] else []
+                glosses = _json_loads(row['glosses']) if row['glosses'] else []
+                pos = _json_loads(row['parts_of_speech']) if row['parts_of_speech'] else []
+                
+                # Extract primary word and reading
+                word = kanji_elements[0] if kanji_elements else (reading_elements[0] if reading_elements else "")
+                reading = reading_elements[0] if reading_elements else word
+                
+                # Skip entries without valid word
+                if not word or not glosses:
+                    continue
+                
+                # Create entry
+                entry = DictionaryEntry(
+                    word=word,
+                    reading=reading,
+                    definitions=glosses,
+                    pos=pos,
+                    metadata={
+                        'ent_seq': row['ent_seq'],
+                        'kanji_variants': kanji_elements,
+                        'reading_variants': reading_elements,
+                        'source': 'jmdict'
+                    }
+                )
+                
+                entries.append(entry)
+                
+            except (json.JSONDecodeError, IndexError, KeyError) as e:
+                logger.warning(f"Failed to parse dictionary row {row['ent_seq']}: {e}")
+                continue
+        
         return entries
     
     async def _process_dictionary_batch(self, entries: List[DictionaryEntry]):
         """Process a batch of dictionary entries"""
         try:
             # Prepare texts and metadata for vectorization
-            texts = []
-            metadatas = []
-            doc_ids = []
+            texts = [entry.searchable_text for entry in entries]
+            metadatas = [entry.to_metadata() for entry in entries]
+            doc_ids = [f"dict_{metadata.get('ent_seq', i)}" for i, metadata in enumerate(metadatas)]
             
-            for entry in entries:
-                # Create searchable text combining word, reading, and definitions
-                searchable_text = f"{entry.word} {entry.reading} {' '.join(entry.definitions[:3])}"
-                
-                # Prepare metadata
-                metadata = {
-                    'word': entry.word,
-                    'reading': entry.reading,
-                    'definitions': entry.definitions,
-                    'pos': entry.pos,
-                    'type': 'dictionary_entry',
-                    'source': 'jmdict',
-                    'searchable_text': searchable_text
-                }
-                
-                # Add optional fields
-                if entry.frequency:
-                    metadata['frequency'] = entry.frequency
-                if entry.jlpt_level:
-                    metadata['jlpt_level'] = entry.jlpt_level
-                if entry.metadata:
-                    metadata.update(entry.metadata)
-                
-                texts.append(searchable_text)
-                metadatas.append(metadata)
-                doc_ids.append(f"dict_{entry.metadata.get('ent_seq', len(doc_ids))}")
+            # Embed once (cache misses only) and share the vectors between Chroma and the packed matrix
+            embeddings = await self._embed_with_cache(texts)
+            self._append_to_matrix(doc_ids, embeddings)
             
-            # Add to vector database
-            await embedding_service.add_documents_batch(texts, metadatas, doc_ids)
+            # Entries at or below the resume checkpoint are already in the collection
+            if self._start_id is not None:
+                ent_seqs = np.array([int(metadata['ent_seq']) for metadata in metadatas], dtype=np.int64)
+                keep = np.flatnonzero(ent_seqs > self._start_id)
+                if len(keep) == 0:
+                    return
+                doc_ids = [doc_ids[i] for i in keep]
+                metadatas = [metadatas[i] for i in keep]
+                texts = [texts[i] for i in keep]
+                embeddings = embeddings[keep]
+            
+            self._insert_buffer.append((doc_ids, embeddings, metadatas, texts))
+            self._insert_buffered += len(doc_ids)
+            if self._insert_buffered >= self.BULK_INSERT_SIZE:
+                await self._flush_insert_buffer()
             
         except Exception as e:
             logger.error(f"Failed to process dictionary batch: {e}")
             raise
     
+    async def _flush_insert_buffer(self):
+        """Write the buffered batches to Chroma in one bulk insert"""
+        # Swap the buffer out before awaiting so concurrent batches start a fresh one
+        buffer, self._insert_buffer, self._insert_buffered = self._insert_buffer, [], 0
+        if not buffer:
+            return
+        
+        ids = [doc_id for doc_ids, _, _, _ in buffer for doc_id in doc_ids]
+        embeddings = np.concatenate([embeddings for _, embeddings, _, _ in buffer])
+        metadatas = [metadata for _, _, metadatas, _ in buffer for metadata in metadatas]
+        texts = [text for _, _, _, texts in buffer for text in texts]
+        
+        # One row per sense repeats dict_{ent_seq}; Chroma rejects duplicate ids within a call,
+        # so send the first row per id, the same one the packed matrix keeps
+        first = {}
+        for i, doc_id in enumerate(ids):
+            first.setdefault(doc_id, i)
+        if len(first) < len(ids):
+            keep = list(first.values())
+            ids = [ids[i] for i in keep]
+            embeddings = embeddings[keep]
+            metadatas = [metadatas[i] for i in keep]
+            texts = [texts[i] for i in keep]
+        
+        await self.bulk_insert_vectors(ids, embeddings, metadatas, texts)
+        
+        # add() skips ids already stored, so count the collection rather than the rows sent
+        embedding_service.refresh_count()
+    
+    async def bulk_insert_vectors(self, ids: List[str], embeddings: np.ndarray,
+                                  metadatas: List[Dict[str, Any]], texts: List[str]):
+        """Insert precomputed vectors into Chroma in as few add() calls as its batch limit allows"""
+        max_batch_size = getattr(embedding_service.chroma_client, 'max_batch_size', None) or self.BULK_INSERT_SIZE
+        chunk = min(self.BULK_INSERT_SIZE, max_batch_size)
+        
+        for start in range(0, len(ids), chunk):
+            end = start + chunk
+            await embedding_service.add_documents_batch(
+                texts[start:end], metadatas[start:end], ids[start:end], embeddings=embeddings[start:end]
+            )
+    
+    async def _embed_with_cache(self, texts: List[str]) -> np.ndarray:
+        """Embed texts as a (B, D) float32 matrix, running the model only on cache misses"""
+        model_key = embedding_service.model_name.encode('utf-8') + b'\0'
+        digests = [hashlib.blake2b(model_key + text.encode('utf-8'), digest_size=16).digest() for text in texts]
+        
+        cached = await asyncio.to_thread(self._lookup_cached_embeddings, digests)
+        miss_indices = [i for i, digest in enumerate(digests) if digest not in cached]
+        self._embedding_cache_hits += len(texts) - len(miss_indices)
+        self._embedding_cache_misses += len(miss_indices)
+        
+        new_embeddings = None
+        if miss_indices:
+            new_embeddings = await embedding_service.embed_batch([texts[i] for i in miss_indices])
+            await asyncio.to_thread(self._store_cached_embeddings,
+                                    [digests[i] for i in miss_indices], new_embeddings)
+        
+        dim = new_embeddings.shape[1] if new_embeddings is not None else len(next(iter(cached.values()))) // 4
+        embeddings = np.empty((len(texts), dim), dtype=np.float32)
+        for i, digest in enumerate(digests):
+            blob = cached.get(digest)
+            if blob is not None:
+                embeddings[i] = np.frombuffer(blob, dtype=np.float32)
+        if new_embeddings is not None:
+            embeddings[miss_indices] = new_embeddings
+        
+        return embeddings
+    
+    @staticmethod
+    def _directory_size(path: Path) -> int:
+        """Total size in bytes of the files under path"""
+        return sum(file.stat().st_size for file in Path(path).rglob('*') if file.is_file())
+    
+    def _connect_embedding_cache(self) -> sqlite3.Connection:
+        """Open the embedding cache database, creating its table on first use"""
+        conn = sqlite3.connect(self.embedding_cache_path, timeout=30)
+        if not self._embedding_cache_ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Full precision, so cache hits give Chroma and the matrix the same vectors a fresh
+            # embed would; the older half-precision table is dropped rather than reused
+            conn.execute("DROP TABLE IF EXISTS emb_cache")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS emb_cache_f32 (digest BLOB PRIMARY KEY, embedding BLOB NOT NULL) WITHOUT ROWID"
+            )
+            self._embedding_cache_ready = True
+        return conn
+    
+    def _lookup_cached_embeddings(self, digests: List[bytes]) -> Dict[bytes, bytes]:
+        """Fetch cached FP32 embedding blobs for the given digests"""
+        conn = self._connect_embedding_cache()
+        try:
+            cached = {}
+            for i in range(0, len(digests), self.CACHE_LOOKUP_CHUNK):
+                chunk = digests[i:i + self.CACHE_LOOKUP_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                cached.update(conn.execute(
+                    f"SELECT digest, embedding FROM emb_cache_f32 WHERE digest IN ({placeholders})", chunk
+                ).fetchall())
+            return cached
+        finally:
+            conn.close()
+    
+    def _store_cached_embeddings(self, digests: List[bytes], embeddings: np.ndarray):
+        """Store embeddings in the cache as float32"""
+        blobs = np.asarray(embeddings, dtype=np.float32)
+        conn = self._connect_embedding_cache()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO emb_cache_f32 (digest, embedding) VALUES (?, ?)",
+                    [(digest, blob.tobytes()) for digest, blob in zip(digests, blobs)]
+                )
+        finally:
+            conn.close()
+    
     async def semantic_word_search(self, 
                                   query: str, 
                                   top_k: int = 10, 
                                   pos_filter: Optional[List[str]] = None,
-                                  similarity_threshold: float = 0.6) -> List[Dict[str, Any]]:
+                                  similarity_threshold: float = 0.6,
+                                  query_embedding: Optional[List[float]] = None,
+                                  nprobe: Optional[int] = None,
+                                  exclude_word: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Perform semantic search for dictionary words
         
@@ -241,57 +833,433 @@ class VectorDatabaseManager:
             top_k: Number of results to return
             pos_filter: Filter by parts of speech
             similarity_threshold: Minimum similarity score
+            query_embedding: Precomputed query embedding (skips embedding the query)
+            nprobe: IVF lists probed per query (defaults to IVF_NPROBE; IVF-sized dictionaries only)
+            exclude_word: Drop entries whose word or reading equals this, inside the search
             
         Returns:
             List of dictionary matches with similarity scores
         """
+        # Up to EXACT_SEARCH_MAX_ROWS rows: exact scoring over the packed matrix; up to
+        # PQ_MIN_ROWS: IVF pruning; beyond: PQ candidates with an exact rerank
+        # Scoring and the metadata fetch run in a worker thread on a snapshot of the live
+        # matrix and indexes, so a run publishing new ones cannot swap them mid-search
+        use_exact = 0 < self._matrix_size <= self.EXACT_SEARCH_MAX_ROWS
+        use_ivf = not use_exact and self.ivf_index is not None
+        use_pq = not use_exact and not use_ivf and self.pq_index is not None
+        if not pos_filter and (use_exact or use_ivf or use_pq):
+            query_vector = await self._normalized_query_vector(query, query_embedding)
+            matrix, ids, rows = self._live_matrix()
+            if use_exact:
+                return await asyncio.to_thread(self._semantic_word_search_exact, matrix, ids, rows,
+                                               query_vector, top_k, similarity_threshold, exclude_word)
+            if use_pq:
+                return await asyncio.to_thread(self._semantic_word_search_pq, self.pq_index, matrix, ids, rows,
+                                               query_vector, top_k, similarity_threshold, exclude_word)
+            return await asyncio.to_thread(self._semantic_word_search_ivf, self.ivf_index, ids, rows,
+                                           query_vector, top_k, similarity_threshold, nprobe, exclude_word)
+        
         try:
             # Prepare filter conditions
             where_conditions = {'type': 'dictionary_entry'}
             if pos_filter:
                 # Note: Chroma DB filtering might require more complex logic for list fields
                 pass
+            if exclude_word:
+                where_conditions = {'$and': [
+                    where_conditions,
+                    {'word': {'$ne': exclude_word}},
+                    {'reading': {'$ne': exclude_word}}
+                ]}
             
             # Perform semantic search
-            results = await embedding_service.find_similar(
-                query=query,
-                top_k=top_k,
-                where=where_conditions,
-                threshold=similarity_threshold
-            )
+            if query_embedding is not None:
+                results = await embedding_service.find_similar_by_vector(
+                    query_embedding,
+                    top_k=top_k,
+                    where=where_conditions,
+                    threshold=similarity_threshold
+                )
+            else:
+                results = await embedding_service.find_similar(
+                    query=query,
+                    top_k=top_k,
+                    where=where_conditions,
+                    threshold=similarity_threshold
+                )
             
             # Format results for API response
+            return [
+                self._format_search_result(result.metadata, result.similarity, result.distance)
+                for result in results
+            ]
+            
+        except Exception as e:
+            logger.error(f"Semantic word search failed: {e}")
+            raise
+    
+    async def semantic_word_search_batch(self, queries: List[str], top_k: int = 10,
+                                         similarity_threshold: float = 0.6,
+                                         query_embeddings: Optional[np.ndarray] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Semantic search for several queries sharing one embedding forward pass
+        
+        Args:
+            queries: Search queries in Japanese
+            top_k: Number of results to return per query
+            similarity_threshold: Minimum similarity score
+            query_embeddings: Precomputed (len(queries), D) embeddings (skips embedding the queries)
+            
+        Returns:
+            One result list per query, in query order
+        """
+        if not queries:
+            return []
+        
+        if query_embeddings is not None:
+            query_matrix = np.array(query_embeddings, dtype=np.float32)
+        else:
+            query_matrix = await embedding_service.embed_batch(queries)
+        query_matrix /= np.maximum(np.linalg.norm(query_matrix, axis=1, keepdims=True), 1e-12)
+        
+        # Exact path: one GEMM scores every query against the packed matrix
+        matrix, ids, _ = self._live_matrix()
+        if 0 < len(ids) <= self.EXACT_SEARCH_MAX_ROWS:
+            return await asyncio.to_thread(self._exact_batch_hits, matrix, ids, query_matrix,
+                                           top_k, similarity_threshold)
+        
+        # IVF path: one faiss search call for all queries
+        if self.ivf_index is not None:
+            return await asyncio.to_thread(self._ivf_batch_hits, self.ivf_index, ids, query_matrix,
+                                           top_k, similarity_threshold)
+        
+        return await asyncio.gather(*[
+            self.semantic_word_search(query, top_k=top_k, similarity_threshold=similarity_threshold,
+                                      query_embedding=embedding.tolist())
+            for query, embedding in zip(queries, query_matrix)
+        ])
+    
+    def _live_matrix(self) -> Tuple[np.ndarray, List[str], Dict[str, int]]:
+        """Consistent (matrix, ids, rows) view of the live packed matrix to hand to a worker thread"""
+        return self._matrix[:self._matrix_size], self._matrix_ids, self._matrix_rows
+    
+    def _semantic_word_search_exact(self, matrix: np.ndarray, ids: List[str], rows: Dict[str, int],
+                                    query_vector: np.ndarray, top_k: int, similarity_threshold: float,
+                                    exclude_word: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Exact cosine search as one GEMV over the packed matrix, then a metadata fetch"""
+        try:
+            scores = matrix @ query_vector
+            if exclude_word:
+                scores[self._word_entry_rows(exclude_word, rows)] = -np.inf
+            k = min(top_k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            
+            return self._format_matrix_hits(top, scores[top], similarity_threshold, ids)
+            
+        except Exception as e:
+            logger.error(f"Exact semantic word search failed: {e}")
+            raise
+    
+    def _exact_batch_hits(self, matrix: np.ndarray, ids: List[str], query_matrix: np.ndarray,
+                          top_k: int, similarity_threshold: float) -> List[List[Dict[str, Any]]]:
+        """Exact search for a (Q, D) block of unit queries as one GEMM"""
+        scores = query_matrix @ matrix.T
+        k = min(top_k, scores.shape[1])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row_scores, row_top in zip(scores, top):
+            row_top = row_top[np.argsort(-row_scores[row_top])]
+            results.append(self._format_matrix_hits(row_top, row_scores[row_top], similarity_threshold, ids))
+        return results
+    
+    def _semantic_word_search_pq(self, index, matrix: np.ndarray, ids: List[str], rows: Dict[str, int],
+                                 query_vector: np.ndarray, top_k: int, similarity_threshold: float,
+                                 exclude_word: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Semantic search over the PQ index with exact FP32 rerank
+        
+        Candidates come from asymmetric PQ distances (codebook lookups), then
+        the top_k * PQ_RERANK_FACTOR candidates are rescored exactly.
+        """
+        try:
+            excluded_rows = self._word_entry_rows(exclude_word, rows) if exclude_word else np.empty(0, dtype=np.int64)
+            
+            # Candidate pass over compressed codes
+            n_candidates = top_k * self.PQ_RERANK_FACTOR + len(excluded_rows)
+            _, candidate_ids = index.search(query_vector[None, :], n_candidates)
+            doc_ids = [f"dict_{ent_seq}" for ent_seq in dict.fromkeys(candidate_ids[0].tolist()) if ent_seq >= 0]
+            if not doc_ids:
+                return []
+            
+            # Rerank from the packed matrix when it holds every candidate, fetching
+            # metadata only for the top_k survivors
+            if all(doc_id in rows for doc_id in doc_ids):
+                candidate_rows = np.array([rows[doc_id] for doc_id in doc_ids], dtype=np.int64)
+                candidate_rows = candidate_rows[~np.isin(candidate_rows, excluded_rows)]
+                top_rows, top_scores = _rerank_top_k(query_vector, matrix, candidate_rows, top_k)
+                return self._format_matrix_hits(top_rows, top_scores, similarity_threshold, ids)
+            
+            # Otherwise against the full-precision vectors stored in Chroma
+            stored = embedding_service.collection.get(ids=doc_ids, include=['embeddings', 'metadatas'])
+            similarities = _cosine_similarities(query_vector, np.asarray(stored['embeddings'], dtype=np.float32))
+            
             formatted_results = []
-            for result in results:
-                formatted_result = {
-                    'word': result.metadata.get('word', ''),
-                    'reading': result.metadata.get('reading', ''),
-                    'definitions': result.metadata.get('definitions', []),
-                    'pos': result.metadata.get('pos', []),
-                    'similarity': result.similarity,
-                    'confidence': result.similarity,
-                    'source': 'semantic_search',
-                    'metadata': {
-                        'search_score': result.similarity,
-                        'distance': result.distance,
-                        'ent_seq': result.metadata.get('ent_seq')
-                    }
-                }
-                
-                # Add optional fields if available
-                if 'frequency' in result.metadata:
-                    formatted_result['frequency'] = result.metadata['frequency']
-                if 'jlpt_level' in result.metadata:
-                    formatted_result['jlpt_level'] = result.metadata['jlpt_level']
-                
-                formatted_results.append(formatted_result)
+            for i in np.argsort(-similarities):
+                similarity = float(similarities[i])
+                if similarity < similarity_threshold or len(formatted_results) == top_k:
+                    break
+                metadata = stored['metadatas'][i]
+                if exclude_word and exclude_word in (metadata.get('word'), metadata.get('reading')):
+                    continue
+                formatted_results.append(self._format_search_result(metadata, similarity, 1.0 - similarity))
             
             return formatted_results
             
         except Exception as e:
-            logger.error(f"Semantic word search failed: {e}")
+            logger.error(f"PQ semantic word search failed: {e}")
+            raise
+    
+    def _semantic_word_search_ivf(self, index, ids: List[str], rows: Dict[str, int],
+                                  query_vector: np.ndarray, top_k: int, similarity_threshold: float,
+                                  nprobe: Optional[int] = None,
+                                  exclude_word: Optional[str] = None) -> List[Dict[str, Any]]:
+        """IVF search probing nprobe inverted lists; IVF-Flat inner products are already exact"""
+        try:
+            excluded_rows = self._word_entry_rows(exclude_word, rows) if exclude_word else np.empty(0, dtype=np.int64)
+            
+            # Over-fetch only by the number of excluded rows, so top_k survive the exclusion;
+            # nprobe goes in per-call parameters since concurrent searches share the index
+            params = faiss.SearchParametersIVF(nprobe=nprobe or self.IVF_NPROBE)
+            scores, hits = index.search(query_vector[None, :], top_k + len(excluded_rows), params=params)
+            keep = hits[0] >= 0
+            if len(excluded_rows):
+                keep &= ~np.isin(hits[0], excluded_rows)
+            
+            return self._format_matrix_hits(hits[0][keep][:top_k], scores[0][keep][:top_k], similarity_threshold, ids)
+            
+        except Exception as e:
+            logger.error(f"IVF semantic word search failed: {e}")
             raise
     
+    def _ivf_batch_hits(self, index, ids: List[str], query_matrix: np.ndarray,
+                        top_k: int, similarity_threshold: float) -> List[List[Dict[str, Any]]]:
+        """IVF search for a (Q, D) block of unit queries in one faiss call"""
+        params = faiss.SearchParametersIVF(nprobe=self.IVF_NPROBE)
+        scores, hits = index.search(query_matrix, top_k, params=params)
+        return [
+            self._format_matrix_hits(row_hits[row_hits >= 0], row_scores[row_hits >= 0], similarity_threshold, ids)
+            for row_scores, row_hits in zip(scores, hits)
+        ]
+    
+    def _word_entry_rows(self, word: str, rows: Dict[str, int]) -> np.ndarray:
+        """Packed-matrix rows of entries whose word or reading equals word"""
+        stored = embedding_service.collection.get(where={'$or': [{'word': word}, {'reading': word}]}, include=[])
+        return np.array([rows[doc_id] for doc_id in stored['ids'] if doc_id in rows], dtype=np.int64)
+    
+    async def _normalized_query_vector(self, query: str, query_embedding: Optional[List[float]] = None) -> np.ndarray:
+        """Unit-length float32 query vector, embedding the query if needed"""
+        if query_embedding is None:
+            query_embedding = await embedding_service.embed_query(query)
+        query_vector = np.array(query_embedding, dtype=np.float32)
+        query_vector /= max(float(np.linalg.norm(query_vector)), 1e-12)
+        return query_vector
+    
+    def _format_matrix_hits(self, rows: np.ndarray, scores: np.ndarray, similarity_threshold: float,
+                            ids: List[str]) -> List[Dict[str, Any]]:
+        """Format best-first matrix rows above the threshold using their Chroma metadata"""
+        keep = scores >= similarity_threshold
+        rows, scores = rows[keep], scores[keep]
+        if len(rows) == 0:
+            return []
+        
+        doc_ids = [ids[i] for i in rows]
+        stored = embedding_service.collection.get(ids=doc_ids, include=['metadatas'])
+        metadata_by_id = dict(zip(stored['ids'], stored['metadatas']))
+        
+        formatted_results = []
+        for doc_id, score in zip(doc_ids, scores):
+            if doc_id in metadata_by_id:
+                similarity = float(score)
+                formatted_results.append(
+                    self._format_search_result(metadata_by_id[doc_id], similarity, 1.0 - similarity)
+                )
+        
+        return formatted_results
+    
+    def _format_search_result(self, metadata: Dict[str, Any], similarity: float, distance: float) -> Dict[str, Any]:
+        """Format a stored dictionary entry as an API search result"""
+        formatted_result = {
+            'word': metadata.get('word', ''),
+            'reading': metadata.get('reading', ''),
+            'definitions': metadata.get('definitions', []),
+            'pos': metadata.get('pos', []),
+            'similarity': similarity,
+            'confidence': similarity,
+            'source': 'semantic_search',
+            'metadata': {
+                'search_score': similarity,
+                'distance': distance,
+                'ent_seq': metadata.get('ent_seq')
+            }
+        }
+        
+        # Add optional fields if available
+        if 'frequency' in metadata:
+            formatted_result['frequency'] = metadata['frequency']
+        if 'jlpt_level' in metadata:
+            formatted_result['jlpt_level'] = metadata['jlpt_level']
+        
+        return formatted_result
+    
+    def _load_matrix(self):
+        """Memory-map the persisted packed matrix, or start empty"""
+        self._reset_matrix()
+        if not (os.path.exists(self.matrix_path) and os.path.exists(self.matrix_ids_path)):
+            return
+        try:
+            matrix = np.load(self.matrix_path, mmap_mode='r')
+            ids = np.load(self.matrix_ids_path).tolist()
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to load packed embedding matrix: {e}")
+            return
+        if len(ids) != len(matrix):
+            logger.warning("Packed embedding matrix and id list disagree; ignoring them")
+            return
+        self._matrix = matrix
+        self._matrix_ids = ids
+        self._matrix_size = len(ids)
+        self._matrix_rows = {doc_id: i for i, doc_id in enumerate(ids)}
+    
+    def _reset_matrix(self):
+        """Empty the live packed matrix"""
+        self._matrix = np.empty((0, 0), dtype=np.float32)
+        self._matrix_ids: List[str] = []
+        self._matrix_size = 0
+        self._matrix_rows: Dict[str, int] = {}
+    
+    def _reset_staged_matrix(self):
+        """Start an empty staging matrix for a rebuild; searches keep using the live one"""
+        self._staged_matrix = np.empty((0, 0), dtype=np.float32)
+        self._staged_ids: List[str] = []
+        self._staged_size = 0
+        self._staged_rows: Dict[str, int] = {}
+    
+    def _append_to_matrix(self, doc_ids: List[str], vectors: np.ndarray):
+        """Append normalized vectors for unseen doc ids to the staging matrix, growing capacity by doubling"""
+        keep = []
+        for i, doc_id in enumerate(doc_ids):
+            # Chroma keeps the first vector added for an id, so the matrix does too
+            if doc_id not in self._staged_rows:
+                self._staged_rows[doc_id] = self._staged_size + len(keep)
+                keep.append(i)
+        if not keep:
+            return
+        
+        vectors = np.asarray(vectors, dtype=np.float32)[keep]
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        
+        needed = self._staged_size + len(keep)
+        if self._staged_matrix.shape[0] < needed or self._staged_matrix.shape[1] != vectors.shape[1]:
+            capacity = max(needed, 2 * self._staged_matrix.shape[0], 1024)
+            grown = np.empty((capacity, vectors.shape[1]), dtype=np.float32)
+            if self._staged_size:
+                grown[:self._staged_size] = self._staged_matrix[:self._staged_size]
+            self._staged_matrix = grown
+        
+        self._staged_matrix[self._staged_size:needed] = vectors
+        self._staged_ids.extend(doc_ids[i] for i in keep)
+        self._staged_size = needed
+    
+    def _save_matrix(self, matrix: np.ndarray, ids: List[str]):
+        """Persist a packed matrix as .npy so cold starts can mmap it"""
+        if not len(ids):
+            return
+        
+        # Write beside and rename over, so a live mmap keeps its old inode instead of seeing a rewrite
+        for path, array in ((self.matrix_path, matrix), (self.matrix_ids_path, np.array(ids))):
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                np.save(f, array)
+            os.replace(tmp_path, path)
+        logger.info(f"Packed embedding matrix saved to {self.matrix_path} ({len(ids)} vectors)")
+    
+    def _load_ivf_index(self):
+        """Load a persisted IVF index if it matches the loaded matrix"""
+        if not FAISS_AVAILABLE or not self._matrix_size or not os.path.exists(self.ivf_index_path):
+            return None
+        try:
+            index = faiss.read_index(self.ivf_index_path)
+        except Exception as e:
+            logger.warning(f"Failed to load IVF index from {self.ivf_index_path}: {e}")
+            return None
+        return index if index.ntotal == self._matrix_size else None
+    
+    def _build_ivf_index(self, matrix: np.ndarray):
+        """Train an IVF-Flat index over a packed matrix in the IVF size tier, or return None"""
+        n_rows = len(matrix)
+        if not FAISS_AVAILABLE or not self.EXACT_SEARCH_MAX_ROWS < n_rows <= self.PQ_MIN_ROWS:
+            self._remove_index_file(self.ivf_index_path)
+            return None
+        
+        dim = matrix.shape[1]
+        nlist = min(self.IVF_MAX_LISTS, int(np.sqrt(n_rows)))
+        
+        quantizer = faiss.IndexFlatIP(dim)
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        sample = np.random.default_rng(0).choice(n_rows, min(n_rows, self.IVF_TRAIN_SIZE), replace=False)
+        index.train(np.ascontiguousarray(matrix[np.sort(sample)]))
+        index.add(np.ascontiguousarray(matrix))
+        faiss.write_index(index, self.ivf_index_path)
+        logger.info(f"IVF index ({nlist} lists) saved to {self.ivf_index_path}")
+        return index
+    
+    @staticmethod
+    def _remove_index_file(path: str):
+        """Delete an index file left by an earlier run in another size tier"""
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    
+    def _load_pq_index(self):
+        """Load a persisted PQ index if faiss is available and it matches the loaded matrix"""
+        if not FAISS_AVAILABLE or not os.path.exists(self.pq_index_path):
+            return None
+        try:
+            index = faiss.read_index(self.pq_index_path)
+        except Exception as e:
+            logger.warning(f"Failed to load PQ index from {self.pq_index_path}: {e}")
+            return None
+        return index if not self._matrix_size or index.ntotal == self._matrix_size else None
+    
+    def _pq_subquantizers(self, dim: int) -> int:
+        """Largest supported subquantizer count that divides the embedding dimension"""
+        for m in (self.PQ_SUBQUANTIZERS, 64, 48, 32, 16, 8, 4, 2):
+            if dim % m == 0:
+                return m
+        return 1
+    
+    def _build_pq_index(self, matrix: np.ndarray, ids: List[str]):
+        """Train PQ codebooks over a packed matrix in the PQ size tier and encode every row by ent_seq, or return None"""
+        n_rows = len(matrix)
+        if not FAISS_AVAILABLE or n_rows <= self.PQ_MIN_ROWS:
+            self._remove_index_file(self.pq_index_path)
+            return None
+        
+        matrix = np.ascontiguousarray(matrix)
+        dim = matrix.shape[1]
+        m = self._pq_subquantizers(dim)
+        ent_seqs = np.array([int(doc_id.rsplit('_', 1)[1]) for doc_id in ids], dtype=np.int64)
+        
+        index = faiss.IndexIDMap2(faiss.IndexPQ(dim, m, 8, faiss.METRIC_INNER_PRODUCT))
+        sample = np.random.default_rng(0).choice(n_rows, min(n_rows, self.PQ_TRAIN_SIZE), replace=False)
+        index.train(matrix[np.sort(sample)])
+        index.add_with_ids(matrix, ent_seqs)
+        faiss.write_index(index, self.pq_index_path)
+        logger.info(f"PQ index ({m} x 8-bit codes) saved to {self.pq_index_path} ({index.ntotal} vectors)")
+        return index
+    
     async def find_related_words(self, 
                                 word: str, 
                                 top_k: int = 5, 
@@ -308,26 +1276,104 @@ class VectorDatabaseManager:
             List of related words with similarity scores
         """
         try:
-            # Search for semantically similar words
-            results = await self.semantic_word_search(
+            # Reuse the stored entry embedding when the word is in the dictionary
+            query_embedding = self._stored_word_embedding(word)
+            
+            # Search for semantically similar words; exact matches are filtered inside the search
+            return await self.semantic_word_search(
                 query=word,
-                top_k=top_k + (2 if exclude_exact else 0),  # Get extra in case we need to filter
-                similarity_threshold=0.3
+                top_k=top_k,
+                similarity_threshold=0.3,
+                query_embedding=query_embedding,
+                exclude_word=word if exclude_exact else None
             )
             
-            # Filter out exact matches if requested
-            if exclude_exact:
-                results = [r for r in results if r['word'] != word and r['reading'] != word]
-            
-            # Return top_k results
-            return results[:top_k]
-            
         except Exception as e:
             logger.error(f"Find related words failed: {e}")
             raise
     
+    def _persist_progress(self):
+        """Atomically write vectorization progress next to the dictionary"""
+        self._status_snapshot = None
+        progress = {
+            key: value.isoformat() if isinstance(value, datetime) else value
+            for key, value in self.vectorization_progress.items()
+        }
+        tmp_path = f"{self.progress_path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(progress, f)
+            os.replace(tmp_path, self.progress_path)
+        except OSError as e:
+            logger.warning(f"Failed to persist vectorization progress: {e}")
+    
+    def read_checkpoint(self) -> Optional[int]:
+        """Last ent_seq committed by an unfinished run, or None"""
+        try:
+            with open(self.checkpoint_path, encoding='utf-8') as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return None
+    
+    def _write_checkpoint(self, ent_seq: int):
+        """Durably record that every entry up to ent_seq is in the collection"""
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(str(ent_seq))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.checkpoint_path)
+        except OSError as e:
+            logger.warning(f"Failed to write vectorization checkpoint: {e}")
+    
+    def _clear_checkpoint(self):
+        """Remove the checkpoint once a run completes"""
+        try:
+            os.remove(self.checkpoint_path)
+        except FileNotFoundError:
+            pass
+    
+    def _load_progress(self):
+        """Restore progress from a previous process; an unfinished run is reported as interrupted"""
+        if not os.path.exists(self.progress_path):
+            return
+        try:
+            with open(self.progress_path, encoding='utf-8') as f:
+                progress = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to load vectorization progress: {e}")
+            return
+        
+        for key in ('start_time', 'last_update'):
+            if progress.get(key):
+                progress[key] = datetime.fromisoformat(progress[key])
+        if progress.get('status') == 'processing':
+            progress['status'] = 'interrupted'
+        self.vectorization_progress.update(progress)
+    
+    def _stored_word_embedding(self, word: str) -> Optional[List[float]]:
+        """Embedding already stored for a dictionary word, or None if the word is not vectorized"""
+        if not embedding_service.collection:
+            return None
+        
+        try:
+            stored = embedding_service.collection.get(where={'word': word}, limit=1, include=['embeddings'])
+        except Exception as e:
+            logger.warning(f"Stored embedding lookup failed for {word}: {e}")
+            return None
+        
+        embeddings = stored.get('embeddings')
+        if embeddings is None or len(embeddings) == 0:
+            return None
+        return [float(value) for value in embeddings[0]]
+    
     async def get_vectorization_status(self) -> Dict[str, Any]:
         """Get the current status of dictionary vectorization"""
+        now = time.monotonic()
+        if self._status_snapshot is not None and now - self._status_time < self.STATUS_TTL:
+            return self._status_snapshot
+        
         status = dict(self.vectorization_progress)
         
         # Calculate additional metrics
@@ -341,18 +1387,17 @@ class VectorDatabaseManager:
                 status['eta_seconds'] = eta_seconds
                 status['processing_rate'] = rate
         
-        # Add embedding service stats
+        # Add embedding service stats from its in-process counters
         if embedding_service.collection:
-            try:
-                collection_stats = await embedding_service.get_collection_stats()
-                status['collection_stats'] = {
-                    'total_embeddings': collection_stats.total_embeddings,
-                    'database_size_mb': collection_stats.database_size_mb,
-                    'embedding_dimension': collection_stats.embedding_dimension
-                }
-            except Exception as e:
-                logger.warning(f"Failed to get collection stats: {e}")
+            snapshot = embedding_service.snapshot()
+            status['collection_stats'] = {
+                'total_embeddings': snapshot['total_vectors'],
+                'database_size_mb': snapshot['db_size_mb'],
+                'embedding_dimension': snapshot['embedding_dimension']
+            }
         
+        self._status_snapshot = status
+        self._status_time = now
         return status
 
 # Global vector database manager instance
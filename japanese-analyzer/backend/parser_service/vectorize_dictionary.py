@@ -7,14 +7,73 @@ Processes the existing 212K+ dictionary entries for semantic search
 import asyncio
 import sys
 import argparse
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 import time
 from datetime import datetime
+from itertools import islice
+
+import numpy as np
+from tqdm.asyncio import tqdm
 
 from embedding_service import initialize_embedding_service, embedding_service
 from vector_database import vector_db_manager
 
-async def vectorize_dictionary_entries(batch_size=50, max_entries=None, test_mode=False):
+# Optional uvloop (libuv event loop; not available on Windows)
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
+
+# Report through a queue so the event loop never blocks on terminal writes;
+# the listener thread does the actual output
+log_queue = queue.Queue(-1)
+log_listener = QueueListener(log_queue, logging.StreamHandler(sys.stdout))
+logger = logging.getLogger("vectorize")
+logger.setLevel(logging.INFO)
+logger.addHandler(QueueHandler(log_queue))
+logger.propagate = False
+
+# Queries exercised by test_semantic_search
+TEST_QUERIES = (
+    "食べる",  # to eat
+    "美しい",  # beautiful
+    "学校",    # school
+    "愛",      # love
+)
+
+# One search result line plus its first definitions, bound once
+RESULT_TEMPLATE = "    {i}. {word} ({reading}) - {sim:.1%}\n       {defs}".format
+
+# Test query embeddings reused across runs (invalidated when the model changes)
+QUERY_CACHE_PATH = Path(__file__).parent / ".query_cache.npz"
+
+def load_query_cache(refresh=False):
+    """Load cached test query embeddings as {query: embedding}"""
+    if refresh or not QUERY_CACHE_PATH.exists():
+        return {}
+    try:
+        with np.load(QUERY_CACHE_PATH) as data:
+            if str(data['model']) != embedding_service.model_name:
+                return {}
+            return dict(zip(data['queries'].tolist(), data['embeddings']))
+    except (OSError, KeyError, ValueError):
+        return {}
+
+def save_query_cache(cache):
+    """Persist {query: embedding} test query embeddings"""
+    np.savez(
+        QUERY_CACHE_PATH,
+        queries=np.array(list(cache)),
+        embeddings=np.stack(list(cache.values())),
+        model=np.array(embedding_service.model_name)
+    )
+
+async def vectorize_dictionary_entries(batch_size=256, max_entries=None, test_mode=False, max_inflight=8,
+                                       auto_batch=False, bulk=False, precision=None, restart=False):
     """
     Vectorize dictionary entries for semantic search
     
@@ -22,113 +81,137 @@ async def vectorize_dictionary_entries(batch_size=50, max_entries=None, test_mod
         batch_size: Number of entries to process in each batch
         max_entries: Maximum entries to process (for testing)
         test_mode: Run in test mode with smaller dataset
+        max_inflight: Number of batches embedded concurrently
+        auto_batch: Pick the batch size from the loaded model and device
+        bulk: Create the collection with bulk-load HNSW settings if it does not exist yet
+        precision: Embedding model format ("fp32", "fp16", "int8"; default: fastest available)
+        restart: Ignore the checkpoint left by an interrupted run
     """
     try:
-        print("🚀 Starting Dictionary Vectorization")
-        print("=" * 50)
+        logger.info("🚀 Starting Dictionary Vectorization")
+        logger.info("=" * 50)
         
         # Initialize embedding service
-        print("📦 Initializing embedding service...")
-        await initialize_embedding_service()
+        logger.info("📦 Initializing embedding service...")
+        await initialize_embedding_service(bulk_load=bulk, precision=precision)
         
         if not embedding_service.model or not embedding_service.collection:
             raise RuntimeError("Failed to initialize embedding service")
         
-        print("✅ Embedding service ready")
+        logger.info("✅ Embedding service ready")
+        
+        if auto_batch:
+            batch_size = embedding_service.suggest_batch_size()
+            logger.info(f"📐 Auto batch size: {batch_size}")
         
         # Set parameters for test mode
         if test_mode:
             max_entries = 100
             batch_size = 10
-            print(f"🧪 Test mode: Processing {max_entries} entries in batches of {batch_size}")
+            logger.info(f"🧪 Test mode: Processing {max_entries} entries in batches of {batch_size}")
         else:
-            print(f"🗄️ Production mode: Processing all entries in batches of {batch_size}")
+            logger.info(f"🗄️ Production mode: Processing all entries in batches of {batch_size} ({max_inflight} in flight)")
             if max_entries:
-                print(f"📊 Limited to {max_entries} entries")
+                logger.info(f"📊 Limited to {max_entries} entries")
+        
+        # Resume after the last checkpointed entry of an interrupted run
+        start_id = None if restart else vector_db_manager.read_checkpoint()
+        if start_id is not None:
+            logger.info(f"⏩ Resuming after entry {start_id}")
         
-        # Start vectorization
-        start_time = time.time()
+        # Start vectorization (monotonic ns clock: immune to wall-clock jumps, precise on short runs)
+        start_ns = time.perf_counter_ns()
         
-        await vector_db_manager.vectorize_dictionary(
+        # Batches are fanned out inside the manager, at most max_inflight at a time
+        progress = vector_db_manager.vectorize_dictionary_stream(
             batch_size=batch_size,
-            max_entries=max_entries
+            max_entries=max_entries,
+            max_concurrent_batches=max_inflight,
+            start_id=start_id
         )
+        processed, total = await anext(progress)
+        with tqdm(total=total, unit="vec") as pbar:
+            async for processed, total in progress:
+                pbar.update(processed - pbar.n)
         
-        end_time = time.time()
-        duration = end_time - start_time
+        duration = (time.perf_counter_ns() - start_ns) / 1e9
         
-        # Get final stats
-        stats = await vector_db_manager.get_vectorization_status()
-        collection_stats = await embedding_service.get_collection_stats()
-        performance_stats = embedding_service.get_performance_stats()
+        # Final stats were collected during the run
+        report = vector_db_manager.last_report
         
-        print("\n" + "=" * 50)
-        print("🎉 Vectorization Complete!")
-        print(f"⏱️  Duration: {duration:.2f} seconds")
-        print(f"📊 Processed: {stats['processed_entries']:,} entries")
-        print(f"🗄️  Database size: {collection_stats.database_size_mb:.1f} MB")
-        print(f"📈 Cache hit rate: {performance_stats['cache_hit_rate']:.1%}")
+        logger.info("\n" + "=" * 50)
+        logger.info("🎉 Vectorization Complete!")
+        logger.info(f"⏱️  Duration: {duration:.2f} seconds")
+        logger.info(f"📊 Processed: {report.processed:,} entries")
+        logger.info(f"🗄️  Database size: {report.db_size_mb:.1f} MB")
+        logger.info(f"📈 Cache hit rate: {report.cache_hit_rate:.1%}")
         
-        if stats['processed_entries'] > 0:
-            rate = stats['processed_entries'] / duration
-            print(f"⚡ Processing rate: {rate:.1f} entries/second")
+        if report.processed > 0:
+            rate = report.processed / duration
+            logger.info(f"⚡ Processing rate: {rate:.1f} entries/second")
         
         return True
         
     except Exception as e:
-        print(f"❌ Vectorization failed: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Vectorization failed: {e}")
         return False
 
-async def test_semantic_search():
+async def test_semantic_search(refresh_cache=False):
     """Test semantic search functionality"""
     try:
-        print("\n🔍 Testing Semantic Search")
-        print("-" * 30)
-        
-        test_queries = [
-            "食べる",  # to eat
-            "美しい",  # beautiful
-            "学校",    # school
-            "愛",      # love
-        ]
-        
-        for query in test_queries:
-            print(f"\n🔎 Searching for: {query}")
-            
-            results = await vector_db_manager.semantic_word_search(
-                query=query,
-                top_k=3,
-                similarity_threshold=0.3
-            )
+        logger.info("\n🔍 Testing Semantic Search")
+        logger.info("-" * 30)
+        
+        # Embed only queries missing from the on-disk cache
+        query_cache = load_query_cache(refresh_cache)
+        missing = [query for query in TEST_QUERIES if query not in query_cache]
+        if missing:
+            query_cache.update(zip(missing, await embedding_service.embed_batch(missing)))
+            save_query_cache(query_cache)
+        
+        # One batched search for all queries, reported in query order
+        results_list = await vector_db_manager.semantic_word_search_batch(
+            list(TEST_QUERIES), top_k=3, similarity_threshold=0.3,
+            query_embeddings=np.stack([query_cache[query] for query in TEST_QUERIES])
+        )
+        
+        for query, results in zip(TEST_QUERIES, results_list):
+            logger.info(f"\n🔎 Searching for: {query}")
             
             if results:
-                print(f"  Found {len(results)} results:")
+                logger.info(f"  Found {len(results)} results:")
                 for i, result in enumerate(results, 1):
-                    similarity = result['similarity']
-                    word = result['word']
-                    reading = result['reading']
-                    definitions = result['definitions'][:2]  # First 2 definitions
-                    
-                    print(f"    {i}. {word} ({reading}) - {similarity:.1%}")
-                    print(f"       {'; '.join(definitions)}")
+                    logger.info(RESULT_TEMPLATE(
+                        i=i,
+                        word=result['word'],
+                        reading=result['reading'],
+                        sim=result['similarity'],
+                        defs='; '.join(islice(result['definitions'], 2))  # First 2 definitions
+                    ))
             else:
-                print("  No results found")
+                logger.info("  No results found")
+        
+        logger.info(f"\n💾 Query cache: {len(TEST_QUERIES) - len(missing)} hits, {len(missing)} misses")
         
         return True
         
     except Exception as e:
-        print(f"❌ Semantic search test failed: {e}")
+        logger.error(f"❌ Semantic search test failed: {e}")
         return False
 
 async def main():
     """Main function"""
     parser = argparse.ArgumentParser(description="Vectorize Japanese dictionary for semantic search")
-    parser.add_argument("--batch-size", type=int, default=50, help="Batch size for processing")
+    parser.add_argument("--batch-size", type=int, default=256, help="Batch size for processing")
+    parser.add_argument("--auto-batch", action="store_true", help="Choose the batch size from the model and device")
+    parser.add_argument("--bulk", action="store_true", help="Defer HNSW graph building when loading a new collection")
+    parser.add_argument("--precision", choices=["fp32", "fp16", "int8"], help="Embedding model numeric format")
     parser.add_argument("--max-entries", type=int, help="Maximum entries to process")
+    parser.add_argument("--max-inflight", type=int, default=8, help="Batches embedded concurrently")
     parser.add_argument("--test", action="store_true", help="Run in test mode (100 entries)")
     parser.add_argument("--no-search-test", action="store_true", help="Skip semantic search test")
+    parser.add_argument("--refresh-cache", action="store_true", help="Re-embed the search test queries")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint of an interrupted run")
     
     args = parser.parse_args()
     
@@ -138,7 +221,12 @@ async def main():
     vectorization_success = await vectorize_dictionary_entries(
         batch_size=args.batch_size,
         max_entries=args.max_entries,
-        test_mode=args.test
+        test_mode=args.test,
+        max_inflight=args.max_inflight,
+        auto_batch=args.auto_batch,
+        bulk=args.bulk,
+        precision=args.precision,
+        restart=args.restart
     )
     
     if not vectorization_success:
@@ -146,29 +234,35 @@ async def main():
     
     # Test semantic search unless skipped
     if vectorization_success and not args.no_search_test:
-        search_success = await test_semantic_search()
+        search_success = await test_semantic_search(refresh_cache=args.refresh_cache)
         if not search_success:
             success = False
     
-    print("\n" + "=" * 50)
+    logger.info("\n" + "=" * 50)
     if success:
-        print("🎉 All operations completed successfully!")
-        print("\nNext steps:")
-        print("1. Start the enhanced parser service")
-        print("2. Test semantic search via API endpoints")
-        print("3. Integrate with frontend applications")
+        logger.info("🎉 All operations completed successfully!")
+        logger.info("\nNext steps:")
+        logger.info("1. Start the enhanced parser service")
+        logger.info("2. Test semantic search via API endpoints")
+        logger.info("3. Integrate with frontend applications")
     else:
-        print("❌ Some operations failed. Check logs above.")
+        logger.error("❌ Some operations failed. Check logs above.")
     
     return success
 
 if __name__ == "__main__":
+    log_listener.start()
+    if UVLOOP_AVAILABLE:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
     try:
         result = asyncio.run(main())
         sys.exit(0 if result else 1)
     except KeyboardInterrupt:
-        print("\n⏹️  Operation cancelled by user")
+        logger.warning("\n⏹️  Operation cancelled by user")
         sys.exit(1)
     except Exception as e:
-        print(f"\n💥 Unexpected error: {e}")
-        sys.exit(1)
\ No newline at end of file
+        logger.error(f"\n💥 Unexpected error: {e}")
+        sys.exit(1)
+    finally:
+        # Flush queued records before the interpreter exits
+        log_listener.stop()